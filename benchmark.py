@@ -0,0 +1,530 @@
+"""
+Micro-benchmarks for pypptx and svg2pptx.
+
+Usage: python benchmark.py [name ...]
+
+Runs all benchmarks if no name is specified.
+"""
+import time
+from lxml import etree, objectify
+import pypptx
+
+
+def rate(function, number):
+    """Return the number of calls to function per second"""
+    start = time.time()
+    for i in xrange(number):
+        function(i)
+    return number / (time.time() - start)
+
+
+def report(name, before, after, unit):
+    print '%-24s %12.0f %12.0f %8.1fx  %s' % (name, before, after, after / before, unit)
+
+
+def bench_shapes(number=20000):
+    """Shapes per second: parsing each template vs cloning a prototype"""
+    report('shape', rate(lambda i: objectify.fromstring(
+        pypptx._shape % (i, 'Shape %d' % i, i, i, i, i, 'ellipse')), number),
+        rate(lambda i: pypptx.shape('ellipse', i, i, i, i), number), 'shapes/s')
+    report('cust_shape', rate(lambda i: objectify.fromstring(
+        pypptx._cstmshape % (i, 'Freeform %d' % i, i, i, i, i)), number),
+        rate(lambda i: pypptx.cust_shape(i, i, i, i), number), 'shapes/s')
+    report('cust_table', rate(lambda i: objectify.fromstring(
+        pypptx._table % (i, 'Table %d' % i, i, i, i, i)), number),
+        rate(lambda i: pypptx.cust_table(i, i, i, i), number), 'shapes/s')
+
+
+def bench_colors(number=20000):
+    """Colors per second: building each color vs copying a cached color"""
+    palette = ['1f77b4', 'ff7f0e', '2ca02c', 'd62728', '9467bd', '8c564b']
+    mods = (('alpha', '50%'), ('lumMod', '75%'))
+    report('color', rate(lambda i: pypptx._color(
+        'srgbClr', palette[i % len(palette)], mods), number),
+        rate(lambda i: pypptx.color(
+            srgbClr=palette[i % len(palette)], **dict(mods)), number), 'colors/s')
+    print '%-24s %s' % ('color_cache', pypptx.color_cache.info())
+
+
+def bench_sppr(number=20000, files=('tests/heatgrid.svg', 'tests/circlegrid.svg')):
+    """
+    Shapes per second: building fill and line elements for each shape vs
+    copying cached ones. Also reports the slide XML size in compact mode.
+    """
+    from copy import copy
+    import svg2pptx
+    palette = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b']
+    styles = [{'fill': clr, 'stroke': '#fff', 'stroke-width': '1'} for clr in palette]
+
+    def cached(i):
+        [copy(child) for child in svg2pptx.sppr('rect', styles[i % len(styles)])]
+
+    report('sppr', rate(lambda i: svg2pptx._sppr('rect', *[styles[i % len(styles)].get(key)
+           for key in ('fill', 'stroke', 'stroke-width', 'opacity')] + [False]), number),
+           rate(cached, number), 'shapes/s')
+    print '%-24s %s' % ('sppr_cache', svg2pptx.sppr_cache.info())
+    for svgfile in files:
+        sizes = []
+        for compact in (False, True):
+            shapes = pypptx.p.spTree()
+            svg2pptx.svg2mso(shapes, etree.parse(svgfile), ids=pypptx.IdAllocator(2),
+                             size=(9144000, 6858000), compact=compact)
+            sizes.append(len(etree.tostring(shapes)))
+        print '%-24s %12d %12d %8.1fx  bytes (compact)' % (
+            svgfile, sizes[0], sizes[1], float(sizes[0]) / sizes[1])
+
+
+def bench_csscolor(files=('tests/cellgradient.svg', 'tests/heatmap.svg'), repeat=50):
+    """
+    Colours per second: parsing each fill and stroke (twice, as msclr and
+    clr_grad used to) vs looking up the cached (hex, alpha)
+    """
+    import csscolor
+    from svg2pptx import StyleSheet, re_ns
+
+    def legacy(clr):
+        r, g, b, alpha = csscolor.parse(clr)
+        csscolor.parse(clr)
+        return '%02x%02x%02x' % (r, g, b), alpha
+
+    for svgfile in files:
+        # Collect the resolved fill and stroke of every element
+        sheet, stack, colors = StyleSheet(), [{}], []
+        for event, e in etree.iterwalk(etree.parse(svgfile), events=('start', 'end')):
+            if event == 'end':
+                stack.pop()
+                continue
+            tag = re_ns.match(e.tag).groups()[-1]
+            if tag == 'style' and e.text:
+                sheet.parse(e.text)
+            stack.append(sheet.cascade(stack[-1], e, tag))
+            colors.extend(stack[-1][key] for key in ('fill', 'stroke') if key in stack[-1])
+        report(svgfile, rate(lambda i: [legacy(clr) for clr in colors], repeat) * len(colors),
+               rate(lambda i: [csscolor.resolve(clr) for clr in colors], repeat) * len(colors),
+               'colors/s')
+    print '%-24s %s' % ('csscolor.cache', csscolor.cache.info())
+
+
+def bench_merge(files=('tests/scatterplot.svg', 'tests/jitter.svg', 'tests/circlegrid.svg'),
+                count=50000, merge=1000):
+    """Shapes and slide XML size: one shape per element vs merged shapes"""
+    import svg2pptx
+    cloud = etree.fromstring('<svg><g fill="steelblue">%s</g></svg>' % ''.join(
+        '<circle cx="%d" cy="%d" r="2"/>' % (i * 7 % 940, i * 13 % 705) for i in xrange(count)))
+    trees = [(svgfile, etree.parse(svgfile)) for svgfile in files]
+    trees.append(('%d circles' % count, cloud))
+    for name, tree in trees:
+        shapes, sizes = [], []
+        for n in (0, merge):
+            spTree = pypptx.p.spTree()
+            svg2pptx.svg2mso(spTree, tree, ids=pypptx.IdAllocator(2),
+                             size=(9144000, 6858000), merge=n)
+            shapes.append(len(spTree))
+            sizes.append(len(etree.tostring(spTree)))
+        print '%-24s %12d %12d %8.1fx  shapes (merge=%d)' % (
+            name, shapes[0], shapes[1], float(shapes[0]) / shapes[1], merge)
+        print '%-24s %12d %12d %8.1fx  bytes' % ('', sizes[0], sizes[1], float(sizes[0]) / sizes[1])
+
+
+def bench_simplify(files=('tests/multiline.svg', 'tests/sparkline.svg', 'tests/horizon.svg',
+                          'tests/areaplot.svg', 'tests/violin.svg'),
+                   tolerances=(0.25, 1), count=20000):
+    """Path points and slide XML size, without and with path simplification"""
+    import random
+    import svg2pptx
+    # A random walk with count points, like a detailed map boundary
+    random.seed(0)
+    x, y, walk = 470.0, 350.0, []
+    for i in xrange(count):
+        x, y = x + random.uniform(-0.2, 0.25) * 940 / count * 20, y + random.uniform(-1, 1)
+        walk.append('%.3f,%.3f' % (x % 940, y))
+    trees = [(svgfile, etree.parse(svgfile)) for svgfile in files]
+    trees.append(('%d point walk' % count, etree.fromstring(
+        '<svg><path fill="none" stroke="red" d="M%s"/></svg>' % ' L'.join(walk))))
+    for name, tree in trees:
+        for pixels in (0,) + tolerances:
+            shapes = pypptx.p.spTree()
+            start = time.time()
+            draw = svg2pptx.svg2mso(shapes, tree, ids=pypptx.IdAllocator(2),
+                                    size=(9144000, 6858000),
+                                    simplify=pixels * svg2pptx.emu_per_pixel)
+            duration = time.time() - start
+            size = len(etree.tostring(shapes))
+            if not pixels:
+                vertices, original = draw.vertices[0], size
+                continue
+            print '%-24s %12d %12d %8.1fx  vertices' % (
+                '%s %gpx' % (name, pixels), vertices, draw.vertices[1],
+                float(vertices) / max(draw.vertices[1], 1))
+            print '%-24s %12d %12d %8.1fx  bytes (%.3fs)' % (
+                '', original, size, float(original) / size, duration)
+
+
+def bench_use(count=2000):
+    """Shapes per second: an icon repeated as copies vs referenced by <use>"""
+    import svg2pptx
+    icon = '<g id="icon">%s</g>' % ''.join(
+        '<path d="M%d,0 L%d,10 L%d,5 Z"/>' % (i, i + 3, i + 1) for i in range(10))
+    positions = [(i % 90 * 10, i / 90 * 12) for i in xrange(count)]
+    copies = etree.fromstring('<svg>%s</svg>' % ''.join(
+        icon.replace('id="icon"', 'transform="translate(%d,%d)"' % xy) for xy in positions))
+    uses = etree.fromstring('<svg xmlns:xlink="http://www.w3.org/1999/xlink"><defs>%s</defs>%s</svg>' % (
+        icon, ''.join('<use xlink:href="#icon" x="%d" y="%d"/>' % xy for xy in positions)))
+
+    def convert(tree):
+        shapes = pypptx.p.spTree()
+        svg2pptx.svg2mso(shapes, tree, size=(9144000, 6858000), ids=pypptx.IdAllocator(2))
+        return len(shapes)
+
+    shapes = convert(copies)
+    assert convert(uses) == shapes
+    report('use', rate(lambda i: convert(copies), 1) * shapes,
+           rate(lambda i: convert(uses), 1) * shapes, 'shapes/s')
+
+
+def bench_cache(files=('tests/scatterplot.svg', 'tests/heatgrid.svg', 'tests/sankey.svg'),
+                repeat=20):
+    """Slides per second: converting each SVG vs copying its shapes from a SlideCache"""
+    import shutil
+    import tempfile
+    import svg2pptx
+    from slidecache import SlideCache
+
+    path = tempfile.mkdtemp()
+    cache = SlideCache(path)
+
+    def convert(svgfile, cache=None):
+        shapes = pypptx.p.spTree()
+        svg2pptx.svg2mso(shapes, svgfile, size=(9144000, 6858000), ids=pypptx.IdAllocator(2),
+                         stream=True, cache=cache)
+        return etree.tostring(shapes)
+
+    try:
+        for svgfile in files:
+            assert convert(svgfile) == convert(svgfile, cache)
+            report(svgfile, rate(lambda i: convert(svgfile), repeat),
+                   rate(lambda i: convert(svgfile, cache), repeat), 'slides/s')
+        print '%-24s %s' % ('SlideCache', cache.info())
+    finally:
+        shutil.rmtree(path)
+
+
+def bench_cull(files=('carto.svg', 'tests/diffbar.svg', 'tests/clusterplot.svg'), repeat=20):
+    """
+    Slides per second and slide XML bytes: drawing every element vs culling
+    hidden, empty and off-canvas elements. Both fit the viewBox to the slide
+    """
+    import svg2pptx
+
+    def convert(svgfile, cull):
+        shapes = pypptx.p.spTree()
+        draw = svg2pptx.svg2mso(shapes, svgfile, size=(9144000, 6858000),
+                                ids=pypptx.IdAllocator(2), stream=True, cull=cull)
+        return draw, etree.tostring(shapes)
+
+    for svgfile in files:
+        draw, xml = convert(svgfile, True)
+        report(svgfile, rate(lambda i: convert(svgfile, False), repeat),
+               rate(lambda i: convert(svgfile, True), repeat), 'slides/s')
+        report('  XML bytes', float(len(convert(svgfile, False)[1])), len(xml), 'bytes')
+        print '%-24s %s' % ('  culled', draw.culled)
+
+
+def bench_text(files=('tests/scatterplot2.svg', 'tests/calendarmap.svg', 'tests/wordcloud.svg'),
+               repeat=200):
+    """
+    Labels per second: measuring each label from the font metrics vs looking
+    up the cached fontmetrics.measure()
+    """
+    import fontmetrics
+
+    family = 'Open Sans, Arial, sans-serif'
+
+    for svgfile in files:
+        labels = [e.text for e in etree.parse(svgfile).iter('{http://www.w3.org/2000/svg}text')
+                  if e.text]
+        uncached = lambda i: [(fontmetrics.font(family).width(t) * 12 / 1000.0, 14.4)
+                              for t in labels]
+        report(svgfile, rate(uncached, repeat) * len(labels),
+               rate(lambda i: [fontmetrics.measure(t, family, 12) for t in labels], repeat) * len(labels),
+               'labels/s')
+    print '%-24s %d labels' % ('fontmetrics.cache', len(fontmetrics.cache))
+
+
+def legacy_tag_attrs(e):
+    """The style resolution that svg2pptx.tag_attrs used to do per element"""
+    def css_style(style):
+        d = {}
+        for attr in [x for x in style.split(';') if x.strip()]:
+            keys, values = attr.split(':', 1)
+            d.update(zip(keys.split(), values.split()))
+        return d
+    attrs = dict(e.items())
+    if 'style' in attrs:
+        del attrs['style']
+        attrs.update(css_style(e.get('style')))
+    parent = e.getparent()
+    if parent is not None and parent.tag.endswith('g'):
+        attrs.update(parent.items())
+        if 'style' in attrs:
+            attrs.update(css_style(parent.get('style')))
+    return attrs
+
+
+def bench_styles(files=('tests/heatgrid.svg', 'tests/circlegrid.svg'), repeat=200):
+    """
+    Elements per second: per-element style parsing vs the style cascade.
+    The <style> sheet is parsed once per document, and reported separately.
+
+    The cascade does not make heatgrid or circlegrid faster: it is 0.8-0.9x
+    of the legacy resolver on both. It is only faster on deep groups, like
+    the last benchmark. The legacy resolver merged only the parent <g>'s
+    attributes. The cascade keeps a stack of inherited styles, which alone
+    costs about half the legacy resolver's time, and copies the parent's
+    style for each element that declares anything.
+    """
+    from svg2pptx import StyleSheet, re_ns
+
+    def cascade(tree, sheet):
+        stack = [{}]
+        for event, e in etree.iterwalk(tree, events=('start', 'end')):
+            if event == 'end':
+                stack.pop()
+            else:
+                stack.append(sheet.cascade(stack[-1], e, re_ns.match(e.tag).groups()[-1]))
+
+    # A <g> holding 5,000 styled rects
+    group = etree.fromstring('<svg><g style="fill: red; stroke: blue">%s</g></svg>' % (
+        '<rect class="cell" style="stroke-width: 1px" width="1" height="1"/>' * 5000))
+    trees = [(svgfile, etree.parse(svgfile)) for svgfile in files]
+    trees.append(('<g> with 5000 <rect>', etree.ElementTree(group)))
+    for name, tree in trees:
+        sheet = StyleSheet()
+        start = time.time()
+        for e in tree.iter('{*}style'):
+            sheet.parse(e.text or '')
+        parse = time.time() - start
+        elements = sum(1 for e in tree.iter(tag=etree.Element))
+        number = max(1, repeat * 26 / elements)
+        report(name, rate(lambda i: [(re_ns.match(e.tag), legacy_tag_attrs(e))
+                                     for e in tree.iter(tag=etree.Element)], number) * elements,
+               rate(lambda i: cascade(tree, sheet), number) * elements, 'elements/s')
+        print '%-24s %12.1f ms to parse <style>, %d rules' % ('', parse * 1000, len(sheet.rules))
+
+def legacy_path(d, x, y):
+    """The a:path that svg2pptx.Draw.path used to build, for M, L, C and Z"""
+    import re
+    a = pypptx.a
+    pathstr = re.findall(r'[mMzZlLhHvVcCsSqQtTaA]|[\+\-]?[\d\.e]+', d)
+    n, length, cmd, relative, x1, y1 = 0, len(pathstr), None, False, 0, 0
+    xy = lambda n: (float(pathstr[n]) + (x1 if relative else 0),
+                    float(pathstr[n + 1]) + (y1 if relative else 0))
+    pt = lambda px, py: a.pt(x=str(x(px)), y=str(y(py)))
+    path = a.path(w=str(x(100000)), h=str(y(100000)))
+    while n < length:
+        if pathstr[n].lower() in 'mzlhvcsqta':
+            cmd, relative = pathstr[n].lower(), pathstr[n].islower()
+            n += 1
+        if cmd == 'm':
+            x1, y1 = xy(n)
+            path.append(a.moveTo(pt(x1, y1)))
+            n += 2
+        elif cmd == 'z':
+            path.append(a.close())
+        elif cmd == 'l':
+            x1, y1 = xy(n)
+            path.append(a.lnTo(pt(x1, y1)))
+            n += 2
+        elif cmd == 'c':
+            (xc1, yc1), (xc2, yc2), (x1, y1) = xy(n), xy(n + 2), xy(n + 4)
+            path.append(a.cubicBezTo(pt(xc1, yc1), pt(xc2, yc2), pt(x1, y1)))
+            n += 6
+    return path
+
+
+def bench_paths(segments=5000, repeat=5):
+    """Path coordinates per second: the old Draw.path loop vs svgpath + pypptx.path"""
+    import svgpath
+    x = lambda v: int(float(v) * 9999999 / 940)
+    y = lambda v: int(float(v) * 7777777 / 705)
+    d = 'M0,0 ' + ' '.join('L%.2f,%.2f C%.2f,%.2f %.2f,%.2f %.2f,%.2f' % (
+        i, i % 97, i, i % 89, i + .5, i % 83, i + 1, i % 79) for i in range(segments)) + ' Z'
+    ncoords = len(svgpath.parse(d)[1])
+
+    def convert(i):
+        commands, coords = svgpath.parse(d)
+        points = [0] * len(coords)
+        points[0::2] = [x(v) for v in coords[0::2]]
+        points[1::2] = [y(v) for v in coords[1::2]]
+        pypptx.path(commands, points, x(940), y(705))
+
+    report('path', rate(lambda i: legacy_path(d, x, y), repeat) * ncoords,
+           rate(convert, repeat) * ncoords, 'coords/s')
+    print '%-24s %12s %12.0f %9s  coords/s' % (
+        'svgpath.parse', '', rate(lambda i: svgpath.parse(d), repeat) * ncoords, '')
+
+
+def bench_scaling(count=100000, repeat=5):
+    """Co-ordinates per second: scaling to EMU point by point vs with NumPy"""
+    import random
+    import svg2pptx
+    from pptx import Presentation
+    if svg2pptx.numpy is None:
+        print '%-24s NumPy is not installed' % 'scaling'
+        return
+    ppt = Presentation('layout15x12.pptx')
+    draw = svg2pptx.Draw(ppt.slides.add_slide(ppt.slidelayouts[6]), 940, 705)
+    coords = [random.uniform(-100, 1000) for i in range(count)]
+    assert [draw.x(v) for v in coords] == draw.xs(coords).tolist()
+    report('scaling', rate(lambda i: [draw.x(v) for v in coords], repeat) * count,
+           rate(lambda i: draw.xs(coords), repeat) * count, 'coords/s')
+
+
+def peak_memory(job):
+    """
+    Draw an SVG file with count circles, and return the peak RSS in MB. This
+    runs in a fresh process. job is (svgfile, count, mode). mode is:
+
+    - 'tree': parse the SVG, and hold the shapes in a p:spTree
+    - 'writer': parse the SVG, and write shapes to the slide XML as drawn
+    - 'stream': parse the SVG incrementally too
+    - 'ir': parse the SVG, hold the shapes in a shapeir.ShapeIR, then write them
+    """
+    import os
+    import resource
+    from svg2pptx import svg2mso
+    svgfile, count, mode = job
+    size = (9144000, 6858000)
+    with open(os.devnull, 'wb') as output:
+        if mode == 'tree':
+            shapes = pypptx.p.spTree()
+            svg2mso(shapes, etree.parse(svgfile), size=size, ids=pypptx.IdAllocator(2))
+            output.write(etree.tostring(shapes))
+        elif mode == 'ir':
+            from shapeir import svg2ir, ir2mso
+            ir = svg2ir(etree.parse(svgfile), size=size)
+            with pypptx.SlideWriter(output) as slide:
+                ir2mso(slide, ir)
+        else:
+            with pypptx.SlideWriter(output) as slide:
+                if mode == 'stream':
+                    svg2mso(slide, svgfile, size=size, stream=True)
+                else:
+                    svg2mso(slide, etree.parse(svgfile), size=size)
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def bench_memory(counts=(1000, 10000, 50000)):
+    """
+    Peak RSS against shape count: a p:spTree vs a pypptx.SlideWriter, and the
+    SlideWriter with incremental SVG parsing
+    """
+    import os
+    import tempfile
+    from multiprocessing import Pool
+    pool = Pool(1, maxtasksperchild=1)
+    handle, svgfile = tempfile.mkstemp(suffix='.svg')
+    os.close(handle)
+    try:
+        for count in counts:
+            with open(svgfile, 'w') as out:
+                out.write('<svg>%s</svg>' % ''.join(
+                    '<circle cx="%d" cy="%d" r="5" fill="red"/>' % (i % 940, i % 705)
+                    for i in xrange(count)))
+            tree, writer, stream = [pool.apply(peak_memory, [(svgfile, count, mode)])
+                                    for mode in ('tree', 'writer', 'stream')]
+            # Report shapes per MB, so that higher is better, like other benchmarks
+            report('memory %d shapes' % count, count / tree, count / writer, 'shapes/MB')
+            report('  + iterparse', count / tree, count / stream, 'shapes/MB')
+            print '%-24s %12.1f %12.1f %9s  MB peak RSS (iterparse: %.1f)' % (
+                '', tree, writer, '', stream)
+    finally:
+        os.remove(svgfile)
+        pool.close()
+        pool.join()
+
+
+def bench_ir(files=('tests/scatterplot.svg', 'tests/sankey.svg', 'carto.svg'),
+             counts=(10000, 50000), repeat=20):
+    """
+    Pickled bytes per shape: slide XML vs a shapeir.ShapeIR. Slides per
+    second: svg2mso vs svg2ir then ir2mso. Shapes per MB of peak RSS: a
+    p:spTree vs a ShapeIR
+    """
+    import os
+    import cPickle as pickle
+    import tempfile
+    from multiprocessing import Pool
+    from shapeir import svg2ir, ir2mso
+    import svg2pptx
+
+    size = (9144000, 6858000)
+
+    def direct(svgfile):
+        shapes = pypptx.p.spTree()
+        svg2pptx.svg2mso(shapes, svgfile, size=size, ids=pypptx.IdAllocator(2), stream=True)
+        return shapes
+
+    def via_ir(svgfile):
+        shapes = pypptx.p.spTree()
+        ir2mso(shapes, svg2ir(svgfile, size=size, stream=True), ids=pypptx.IdAllocator(2))
+        return shapes
+
+    for svgfile in files:
+        ir, xml = svg2ir(svgfile, size=size, stream=True), etree.tostring(direct(svgfile))
+        assert etree.tostring(via_ir(svgfile)) == xml
+        count = float(len(ir))
+        report(svgfile, len(pickle.dumps(xml, -1)) / count, len(pickle.dumps(ir, -1)) / count,
+               'bytes/shape pickled')
+        print '%-24s %12s %12.0f %9s  bytes/shape in memory' % ('', '', ir.nbytes() / count, '')
+        report('  convert', rate(lambda i: direct(svgfile), repeat),
+               rate(lambda i: via_ir(svgfile), repeat), 'slides/s')
+        report('  pickle round trip', rate(lambda i: pickle.loads(pickle.dumps(xml, -1)), repeat),
+               rate(lambda i: pickle.loads(pickle.dumps(ir, -1)), repeat), 'slides/s')
+
+    pool = Pool(1, maxtasksperchild=1)
+    handle, svgfile = tempfile.mkstemp(suffix='.svg')
+    os.close(handle)
+    try:
+        for count in counts:
+            with open(svgfile, 'w') as out:
+                out.write('<svg>%s</svg>' % ''.join(
+                    '<circle cx="%d" cy="%d" r="5" fill="red"/>' % (i % 940, i % 705)
+                    for i in xrange(count)))
+            tree, ir = [pool.apply(peak_memory, [(svgfile, count, mode)])
+                        for mode in ('tree', 'ir')]
+            report('memory %d shapes' % count, count / tree, count / ir, 'shapes/MB')
+            print '%-24s %12.1f %12.1f %9s  MB peak RSS' % ('', tree, ir, '')
+    finally:
+        os.remove(svgfile)
+        pool.close()
+        pool.join()
+
+
+benchmarks = {
+    'cache': bench_cache,
+    'colors': bench_colors,
+    'csscolor': bench_csscolor,
+    'cull': bench_cull,
+    'ir': bench_ir,
+    'memory': bench_memory,
+    'merge': bench_merge,
+    'paths': bench_paths,
+    'scaling': bench_scaling,
+    'shapes': bench_shapes,
+    'simplify': bench_simplify,
+    'sppr': bench_sppr,
+    'styles': bench_styles,
+    'text': bench_text,
+    'use': bench_use,
+}
+
+
+if __name__ == '__main__':
+    import sys
+
+    names = sys.argv[1:] or sorted(benchmarks)
+    print '%-24s %12s %12s %9s' % ('benchmark', 'before', 'after', 'speedup')
+    for name in names:
+        benchmarks[name]()
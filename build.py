@@ -1,29 +1,154 @@
 """
-Creates a PPTX with all SVG files in the tests/ folder.
-Useful for testing.
+Creates a PPTX with one slide per SVG file. Useful for testing.
+Converts files in parallel worker processes, and reports failures.
 
-Usage: python build.py
+Usage: python build.py [--jobs N] [--stream] [--merge N] [--simplify PX]
+       [--cache DIR] [--output test.pptx] [file.svg ...]
+
+Converts tests/*.svg if no files are specified.
 """
+import sys
+import time
+import traceback
+from io import BytesIO
+from lxml import etree
+from xml.sax.saxutils import escape
+from pypptx import SlideWriter, PackageWriter
+from svg2pptx import svg2mso, emu_per_pixel
+from slidecache import SlideCache
+
+# Slide title, drawn after the SVG when it is streamed
+title = '<svg><text x="300" y="20">%s</text></svg>'
+
+# SlideCache for each cache directory, in this process
+caches = {}
+
+
+def convert(job):
+    """
+    Convert one SVG file into slide XML. This runs in a worker process.
+    job is (svgfile, size, options), where size is the slide (width, height)
+    in EMU, and options are keyword arguments for svg2mso.
+    Returns a report dict. report['xml'] has the p:sld, or None on failure.
+    report['cached'] is True if the shapes were copied from the cache.
+    report['culled'] counts the elements that were not drawn. See svg2mso.
+    report['start'] is the time.time() when the worker started the job.
+    """
+    svgfile, size, options = job
+    start = time.time()
+    report = {'file': svgfile, 'xml': None, 'error': None, 'shapes': 0, 'cached': False,
+              'culled': 0, 'start': start}
+    try:
+        # options['cache'] is a cache directory. Open it once per process
+        if options.get('cache') is not None:
+            path = options['cache']
+            if path not in caches:
+                caches[path] = SlideCache(path)
+            options = dict(options, cache=caches[path])
+        # Stream the shapes into the slide XML as they are drawn
+        output = BytesIO()
+        with SlideWriter(output) as slide:
+            if options.get('stream'):
+                draw = svg2mso(slide, svgfile, size=size, **options)
+                svg2mso(slide, title % escape(svgfile), size=size)
+            else:
+                tree = etree.parse(svgfile)
+                etree.SubElement(tree.getroot(), 'text', x="300", y="20").text = svgfile
+                draw = svg2mso(slide, tree, size=size, **options)
+        report['cached'] = options.get('cache') is not None and draw is None
+        report['shapes'] = slide.count
+        if draw is not None:
+            report['culled'] = sum(draw.culled.values())
+        report['xml'] = output.getvalue()
+    except Exception:
+        report['error'] = traceback.format_exc()
+    report['time'] = time.time() - start
+    return report
+
+
+def build(svgfiles, output, layout=None, jobs=1, callback=None, pool=None, **options):
+    """
+    Save a PPTX at output with one slide per SVG file, in order. Each slide's
+    shapes are generated in one of jobs worker processes, and written to the
+    PPTX as soon as they are ready (see pypptx.PackageWriter). Each slide has its
+    own shape ids, so the output is deterministic. options are passed to
+    svg2mso, e.g. stream=True parses SVGs incrementally, using less memory.
+    cache is the name of a directory to cache converted slides in (see
+    slidecache.SlideCache), or None.
+
+    layout is a PPTX file name or file. pool is an optional
+    multiprocessing.Pool to convert files in. It is left open, and jobs is
+    ignored.
+
+    Returns a list of reports -- dicts with the file, time taken, number of
+    shapes and error traceback (or None) for each file. callback(report) is
+    called as each file is added.
+    """
+    own_pool = pool is None and jobs > 1
+    if own_pool:
+        from multiprocessing import Pool
+        pool = Pool(jobs)
+
+    reports = []
+    try:
+        # Write each slide into the PPTX as soon as it is converted
+        with PackageWriter(output, layout) as deck:
+            work = [(svgfile, deck.size, options) for svgfile in svgfiles]
+            if pool is not None:
+                results = pool.imap(convert, work)
+            else:
+                results = (convert(job) for job in work)
+            for report in results:
+                xml = report.pop('xml')
+                if xml is not None:
+                    deck.write(xml)
+                reports.append(report)
+                if callback is not None:
+                    callback(report)
+    finally:
+        if own_pool:
+            pool.close()
+            pool.join()
+    return reports
 
 if __name__ == '__main__':
     import glob
-    from lxml import etree
-    from svg2pptx import svg2mso
-    from pptx import Presentation
-
-    Presentation = Presentation()
-    blank_slidelayout = Presentation.slidelayouts[6]
-
-    for svgfile in glob.glob('tests/*.svg'):
-        print svgfile
-        slide = Presentation.slides.add_slide(blank_slidelayout)
-        tree = etree.parse(open(svgfile))
-        title = etree.SubElement(tree.getroot(), 'text', x="300", y="20")
-        title.text = svgfile
-        try:
-            svg2mso(slide, tree)
-        except:
-            print 'Failed'
-            pass
-
-    Presentation.save("test.pptx")
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=1,
+        help='Number of worker processes (default: 1)')
+    parser.add_argument('--layout', default=None,
+        help='PPTX file to use to create blank slides')
+    parser.add_argument('--output', default='test.pptx',
+        help='Output PPTX file name')
+    parser.add_argument('--stream', action='store_true',
+        help='Parse SVGs incrementally, for very large files')
+    parser.add_argument('--merge', type=int, default=0,
+        help='Merge up to N adjacent shapes with the same style into one')
+    parser.add_argument('--simplify', type=float, default=0,
+        help='Drop path points within this many pixels of the path')
+    parser.add_argument('--cache', default=None,
+        help='Directory to cache converted slides in')
+    parser.add_argument('svgfiles', nargs='*')
+    args = parser.parse_args()
+
+    def show(report):
+        status = 'ok' if report['error'] is None else 'FAILED'
+        status = 'cached' if report['cached'] else status
+        print '%-6s %7.3fs %6d shapes %5d culled  %s' % (
+            status, report['time'], report['shapes'], report['culled'], report['file'])
+        if report['error'] is not None:
+            print report['error']
+
+    start = time.time()
+    reports = build(args.svgfiles or sorted(glob.glob('tests/*.svg')), args.output,
+                    layout=args.layout, jobs=args.jobs, callback=show,
+                    stream=args.stream, merge=args.merge,
+                    simplify=args.simplify * emu_per_pixel, cache=args.cache)
+    failed = sum(1 for report in reports if report['error'] is not None)
+    cached = sum(1 for report in reports if report['cached'])
+    print '%d files, %d failed, %d cached, %.3fs' % (
+        len(reports), failed, cached, time.time() - start)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,163 @@
+"""
+Benchmarks svg2mso over a corpus of SVG files, and checks for regressions.
+
+Usage: python corpus.py [--repeat N] [--report corpus.json]
+                        [--baseline baseline.json] [--save-baseline]
+                        [--tolerance 0.2] [file.svg ...]
+
+Each file is converted in a fresh process, repeat times. For each file, the
+report has the fastest time for each phase (parse, dispatch, save), the
+svg2pptx.Profile stats for that run (time per tag, per drawing phase, and the
+slowest elements), the shapes drawn, XML bytes, peak memory and throughput
+(shapes per second).
+
+If --baseline is specified, exits with status 1 if any file's throughput is
+less than (1 - tolerance) times its throughput in the baseline report.
+--save-baseline saves the report as the baseline instead.
+
+Uses tests/*.svg if no files are specified.
+"""
+import sys
+import json
+import time
+import platform
+from lxml import etree
+import pypptx
+import svg2pptx
+
+
+def measure(job):
+    """
+    Convert an SVG file repeat times and return its report. This runs in a
+    fresh process, so that its peak memory is its own. job is (svgfile,
+    repeat, options), where options are keyword arguments for svg2mso.
+    """
+    import resource
+    svgfile, repeat, options = job
+    best = None
+    for i in range(repeat):
+        profile = svg2pptx.Profile()
+        start = time.time()
+        tree = etree.parse(svgfile)
+        parsed = time.time()
+        shapes = pypptx.p.spTree()
+        draw = svg2pptx.svg2mso(shapes, tree, size=(9144000, 6858000),
+                         ids=pypptx.IdAllocator(2), profile=profile, **options)
+        drawn = time.time()
+        xml = etree.tostring(shapes)
+        saved = time.time()
+        run = {
+            'parse': parsed - start,
+            'dispatch': drawn - parsed,
+            'save': saved - drawn,
+            'total': saved - start,
+        }
+        # Per-tag and per-phase times, and the slowest elements
+        run.update(profile.stats())
+        if best is None or run['total'] < best['total']:
+            best = run
+    best.update({
+        'shapes': len(shapes),
+        'bytes': len(xml),
+        'culled': sum(draw.culled.values()),
+        # ru_maxrss is in KB on Linux
+        'peak_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        'shapes_per_s': len(shapes) / best['total'] if best['total'] else 0.0,
+    })
+    return best
+
+
+def run(svgfiles, repeat=5, callback=None, **options):
+    """
+    Return the report for a list of SVG files, as a dict. report['files']
+    maps each file to its report. callback(svgfile, report) is called after
+    each file is measured.
+    """
+    from multiprocessing import Pool
+    pool = Pool(1, maxtasksperchild=1)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'options': options,
+        'files': {},
+    }
+    try:
+        for svgfile in svgfiles:
+            result = report['files'][svgfile] = pool.apply(measure, [(svgfile, repeat, options)])
+            if callback is not None:
+                callback(svgfile, result)
+    finally:
+        pool.close()
+        pool.join()
+    return report
+
+
+def regressions(report, baseline, tolerance=0.2):
+    """
+    Return a list of (svgfile, throughput, baseline throughput) for files
+    whose throughput is less than (1 - tolerance) times the baseline's.
+    """
+    slow = []
+    for svgfile, result in sorted(report['files'].items()):
+        if svgfile not in baseline['files']:
+            continue
+        expected = baseline['files'][svgfile]['shapes_per_s']
+        if result['shapes_per_s'] < expected * (1 - tolerance):
+            slow.append((svgfile, result['shapes_per_s'], expected))
+    return slow
+
+
+if __name__ == '__main__':
+    import glob
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5,
+        help='Number of times to convert each file (default: 5)')
+    parser.add_argument('--report', default='corpus.json',
+        help='JSON report file name')
+    parser.add_argument('--baseline', default=None,
+        help='JSON report to compare throughput against')
+    parser.add_argument('--save-baseline', action='store_true',
+        help='Save the report as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+        help='Allowed fall in throughput (default: 0.2, i.e. 20%%)')
+    parser.add_argument('svgfiles', nargs='*')
+    args = parser.parse_args()
+
+    print '%-28s %8s %8s %8s %8s %7s %9s %8s %10s' % (
+        'file', 'parse', 'dispatch', 'save', 'total', 'shapes', 'bytes', 'peak MB', 'shapes/s')
+
+    def show(svgfile, result):
+        print '%-28s %7.1fms %7.1fms %7.1fms %7.1fms %7d %9d %8.1f %10.0f' % (
+            svgfile, result['parse'] * 1000, result['dispatch'] * 1000, result['save'] * 1000,
+            result['total'] * 1000, result['shapes'], result['bytes'], result['peak_mb'],
+            result['shapes_per_s'])
+
+    report = run(args.svgfiles or sorted(glob.glob('tests/*.svg')), args.repeat, callback=show)
+
+    # Total time per tag and drawing phase, across files
+    totals = {}
+    for result in report['files'].values():
+        for key, stat in result['tags'].items() + result['phases'].items():
+            total = totals.setdefault(key, [0, 0.0])
+            total[0] += stat['count']
+            total[1] += stat['time']
+    for tag, (count, duration) in sorted(totals.items()):
+        print '%-28s %7d calls %9.1fms %9.0f calls/s' % (
+            tag, count, duration * 1000, count / duration if duration else 0)
+
+    with open(args.report, 'w') as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+    if args.baseline is not None:
+        if args.save_baseline:
+            with open(args.baseline, 'w') as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+        else:
+            with open(args.baseline) as handle:
+                slow = regressions(report, json.load(handle), args.tolerance)
+            for svgfile, throughput, expected in slow:
+                print 'REGRESSION %s: %.0f shapes/s, baseline %.0f' % (svgfile, throughput, expected)
+            sys.exit(1 if slow else 0)
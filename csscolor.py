@@ -0,0 +1,151 @@
+"""
+Parses CSS colours into DrawingML hex colours and alpha values.
+
+    resolve('steelblue')                # ('4682b4', 1.0)
+    resolve('rgba(255, 0, 0, .5)')      # ('ff0000', 0.5)
+    resolve('hsl(120, 100%, 25%)')      # ('008000', 1.0)
+
+Supports named colours, transparent, #rgb, #rgba, #rrggbb, #rrggbbaa, rgb(),
+rgba(), hsl() and hsla(), with numbers or percentages, separated by commas or
+spaces (with an optional / before the alpha). Results are cached in cache.
+"""
+import re
+import math
+from pypptx import LRUCache
+
+# CSS Color Module Level 4 named colours
+names = dict((name, (int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)))
+             for name, value in (item.split(':') for item in '''
+    aliceblue:f0f8ff antiquewhite:faebd7 aqua:00ffff aquamarine:7fffd4 azure:f0ffff
+    beige:f5f5dc bisque:ffe4c4 black:000000 blanchedalmond:ffebcd blue:0000ff
+    blueviolet:8a2be2 brown:a52a2a burlywood:deb887 cadetblue:5f9ea0
+    chartreuse:7fff00 chocolate:d2691e coral:ff7f50 cornflowerblue:6495ed
+    cornsilk:fff8dc crimson:dc143c cyan:00ffff darkblue:00008b darkcyan:008b8b
+    darkgoldenrod:b8860b darkgray:a9a9a9 darkgreen:006400 darkgrey:a9a9a9
+    darkkhaki:bdb76b darkmagenta:8b008b darkolivegreen:556b2f darkorange:ff8c00
+    darkorchid:9932cc darkred:8b0000 darksalmon:e9967a darkseagreen:8fbc8f
+    darkslateblue:483d8b darkslategray:2f4f4f darkslategrey:2f4f4f
+    darkturquoise:00ced1 darkviolet:9400d3 deeppink:ff1493 deepskyblue:00bfff
+    dimgray:696969 dimgrey:696969 dodgerblue:1e90ff firebrick:b22222
+    floralwhite:fffaf0 forestgreen:228b22 fuchsia:ff00ff gainsboro:dcdcdc
+    ghostwhite:f8f8ff gold:ffd700 goldenrod:daa520 gray:808080 green:008000
+    greenyellow:adff2f grey:808080 honeydew:f0fff0 hotpink:ff69b4
+    indianred:cd5c5c indigo:4b0082 ivory:fffff0 khaki:f0e68c lavender:e6e6fa
+    lavenderblush:fff0f5 lawngreen:7cfc00 lemonchiffon:fffacd lightblue:add8e6
+    lightcoral:f08080 lightcyan:e0ffff lightgoldenrodyellow:fafad2
+    lightgray:d3d3d3 lightgreen:90ee90 lightgrey:d3d3d3 lightpink:ffb6c1
+    lightsalmon:ffa07a lightseagreen:20b2aa lightskyblue:87cefa
+    lightslategray:778899 lightslategrey:778899 lightsteelblue:b0c4de
+    lightyellow:ffffe0 lime:00ff00 limegreen:32cd32 linen:faf0e6 magenta:ff00ff
+    maroon:800000 mediumaquamarine:66cdaa mediumblue:0000cd mediumorchid:ba55d3
+    mediumpurple:9370db mediumseagreen:3cb371 mediumslateblue:7b68ee
+    mediumspringgreen:00fa9a mediumturquoise:48d1cc mediumvioletred:c71585
+    midnightblue:191970 mintcream:f5fffa mistyrose:ffe4e1 moccasin:ffe4b5
+    navajowhite:ffdead navy:000080 oldlace:fdf5e6 olive:808000 olivedrab:6b8e23
+    orange:ffa500 orangered:ff4500 orchid:da70d6 palegoldenrod:eee8aa
+    palegreen:98fb98 paleturquoise:afeeee palevioletred:db7093
+    papayawhip:ffefd5 peachpuff:ffdab9 peru:cd853f pink:ffc0cb plum:dda0dd
+    powderblue:b0e0e6 purple:800080 rebeccapurple:663399 red:ff0000
+    rosybrown:bc8f8f royalblue:4169e1 saddlebrown:8b4513 salmon:fa8072
+    sandybrown:f4a460 seagreen:2e8b57 seashell:fff5ee sienna:a0522d
+    silver:c0c0c0 skyblue:87ceeb slateblue:6a5acd slategray:708090
+    slategrey:708090 snow:fffafa springgreen:00ff7f steelblue:4682b4 tan:d2b48c
+    teal:008080 thistle:d8bfd8 tomato:ff6347 turquoise:40e0d0 violet:ee82ee
+    wheat:f5deb3 white:ffffff whitesmoke:f5f5f5 yellow:ffff00
+    yellowgreen:9acd32
+'''.split()))
+
+re_function = re.compile(r'(rgba?|hsla?)\((.*)\)$')
+re_separator = re.compile(r'[\s,/]+')
+re_hex = re.compile(r'#([0-9a-f]{3,4}|[0-9a-f]{6}|[0-9a-f]{8})$')
+
+# Hue units in turns
+hue_units = {'deg': 1 / 360.0, 'grad': 1 / 400.0, 'rad': 1 / (2 * math.pi), 'turn': 1.0}
+
+# Colours that cannot be parsed, e.g. url(#gradient) or currentColor
+default = (0, 0, 0, 1.0)
+
+
+def _number(value, scale):
+    """Return a number, or a percentage of scale"""
+    if value.endswith('%'):
+        return float(value[:-1]) * scale / 100
+    return float(value)
+
+
+def _channel(value):
+    return int(round(min(max(value, 0), 255)))
+
+
+def _alpha(value):
+    return min(max(_number(value, 1.0), 0.0), 1.0)
+
+
+def _hue(h, s, l):
+    """Return (r, g, b) for a hue in turns, saturation and lightness in 0-1"""
+    q = l * (1 + s) if l < 0.5 else l + s - l * s
+    p = 2 * l - q
+
+    def channel(t):
+        t %= 1.0
+        if t < 1 / 6.0:
+            v = p + (q - p) * 6 * t
+        elif t < 1 / 2.0:
+            v = q
+        elif t < 2 / 3.0:
+            v = p + (q - p) * (2 / 3.0 - t) * 6
+        else:
+            v = p
+        return _channel(v * 255)
+    return channel(h + 1 / 3.0), channel(h), channel(h - 1 / 3.0)
+
+
+def parse(color):
+    """
+    Return (r, g, b, alpha) for a CSS colour string. r, g, b are integers
+    from 0 to 255, and alpha is a float from 0 to 1. Returns default if the
+    colour cannot be parsed.
+    """
+    color = color.strip().lower()
+    if color in names:
+        return names[color] + (1.0,)
+    if color == 'transparent':
+        return (0, 0, 0, 0.0)
+
+    match = re_hex.match(color)
+    if match:
+        digits = match.group(1)
+        if len(digits) <= 4:
+            digits = ''.join(digit * 2 for digit in digits)
+        values = [int(digits[i:i + 2], 16) for i in range(0, len(digits), 2)]
+        alpha = values[3] / 255.0 if len(values) > 3 else 1.0
+        return values[0], values[1], values[2], alpha
+
+    match = re_function.match(color)
+    if match:
+        args = [arg for arg in re_separator.split(match.group(2)) if arg]
+        try:
+            if len(args) not in (3, 4):
+                raise ValueError(color)
+            alpha = _alpha(args[3]) if len(args) > 3 else 1.0
+            if match.group(1).startswith('rgb'):
+                r, g, b = (_channel(_number(arg, 255)) for arg in args[:3])
+                return r, g, b, alpha
+            hue = re.match(r'([^a-z]*)([a-z]*)$', args[0])
+            h = float(hue.group(1)) * hue_units.get(hue.group(2), hue_units['deg'])
+            s, l = (min(max(_number(arg, 1.0), 0.0), 1.0) for arg in args[1:3])
+            return _hue(h, s, l) + (alpha,)
+        except (ValueError, AttributeError):
+            pass
+    return default
+
+
+def resolve(color):
+    """Return the (hex, alpha) of a CSS colour, e.g. ('ff0000', 1.0) for red"""
+    result = cache.get(color)
+    if result is None:
+        r, g, b, alpha = parse(color)
+        result = cache[color] = ('%02x%02x%02x' % (r, g, b), alpha)
+    return result
+
+cache = LRUCache(maxsize=4096)
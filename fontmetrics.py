@@ -0,0 +1,159 @@
+"""
+Measures text using font metrics, so that text boxes can be sized without
+PowerPoint laying them out.
+
+    measure('Revenue', 'Arial', 12)                 # (48.0, 14.4) in points
+    measure('Revenue', 'sans-serif', 12, bold=True)
+    typeface('Open Sans, sans-serif')               # 'Helvetica', as measured
+
+Helvetica and Helvetica-Bold advance widths (from the Adobe Core 14 AFM
+files) are built in. Arial and the generic sans-serif family share their
+metrics. load_afm() adds other fonts from AFM files. Results are cached in
+cache, so repeated labels (e.g. axis ticks) are measured once.
+"""
+
+
+class Font(object):
+    """
+    Advance widths of a font in 1/1000 em. widths maps characters to widths.
+    Characters not in widths are default wide. ascent and descent are the
+    height above and depth below the baseline, in 1/1000 em. family is the
+    typeface name, e.g. "Helvetica" for Helvetica-Bold, and defaults to name.
+    """
+    def __init__(self, name, widths, default=556, ascent=718, descent=207, family=None):
+        self.name, self.widths, self.default = name, widths, default
+        self.ascent, self.descent = ascent, descent
+        self.family = family or name
+
+    def width(self, text):
+        """Return the width of text in 1/1000 em"""
+        widths, default = self.widths, self.default
+        return sum(widths.get(char, default) for char in text)
+
+
+def _ascii(name, widths, family=None):
+    """Return a Font from a list of widths for characters 32 to 126"""
+    return Font(name, dict(zip((unichr(code) for code in range(32, 127)),
+                               (int(width) for width in widths.split()))), family=family)
+
+fonts = {
+    'helvetica': _ascii('Helvetica', family='Helvetica', widths='''
+        278 278 355 556 556 889 667 191 333 333 389 584 278 333 278 278
+        556 556 556 556 556 556 556 556 556 556 278 278 584 584 584 556
+        1015 667 667 722 722 667 611 778 722 278 500 667 556 833 722 778
+        667 778 722 667 611 722 667 944 667 667 611 278 278 278 469 556
+        333 556 556 500 556 556 278 556 556 222 222 500 222 833 556 556
+        556 556 333 500 278 556 500 722 500 500 500 334 260 334 584'''),
+    'helvetica-bold': _ascii('Helvetica-Bold', family='Helvetica', widths='''
+        278 333 474 556 556 889 722 238 333 333 389 584 278 333 278 278
+        556 556 556 556 556 556 556 556 556 556 333 333 584 584 584 611
+        975 722 722 722 722 667 611 778 722 278 556 722 611 833 722 778
+        667 778 722 667 611 722 667 944 667 667 611 333 278 333 584 556
+        333 556 611 556 611 556 333 611 611 278 278 556 278 889 611 611
+        611 611 389 556 333 611 556 778 556 556 500 389 280 389 584'''),
+}
+
+# Font families that use another font's metrics
+aliases = {
+    'arial': 'helvetica',
+    'sans-serif': 'helvetica',
+    'liberation sans': 'helvetica',
+}
+
+# Generic CSS font families, which are not typefaces
+generic = set(('serif', 'sans-serif', 'monospace', 'cursive', 'fantasy', 'system-ui'))
+
+# Line height, as a multiple of the font size
+line_height = 1.2
+
+
+def load_afm(filename, family=None):
+    """
+    Add the font in an AFM file to fonts and return it. It is registered
+    under its lowercase FontName (e.g. "helvetica-oblique"), or family.
+    """
+    name, family_name, widths, ascent, descent = None, None, {}, 718, 207
+    with open(filename) as handle:
+        for line in handle:
+            key, _, value = line.strip().partition(' ')
+            if key == 'FontName':
+                name = value.strip()
+            elif key == 'FamilyName':
+                family_name = value.strip()
+            elif key == 'Ascender':
+                ascent = abs(int(float(value)))
+            elif key == 'Descender':
+                descent = abs(int(float(value)))
+            elif key == 'C':
+                # e.g. C 32 ; WX 278 ; N space ; B 0 0 0 0 ;
+                fields = dict(field.strip().split(' ', 1) for field in line.split(';')
+                              if field.strip())
+                code = int(fields['C'])
+                if 0 <= code < 256 and 'WX' in fields:
+                    widths[unichr(code)] = int(float(fields['WX']))
+    default = sum(widths.values()) / len(widths) if widths else 556
+    font = Font(name or family, widths, default, ascent, descent, family_name or family)
+    fonts[(family or name).lower()] = font
+    return font
+
+
+def font(family=None, bold=False):
+    """
+    Return the Font for a CSS font-family list, e.g. "Georgia, sans-serif".
+    Uses the first family that has metrics, or Helvetica.
+    """
+    for name in (family or '').split(','):
+        name = name.strip().strip('"\'').lower()
+        name = aliases.get(name, name)
+        if bold and name + '-bold' in fonts:
+            return fonts[name + '-bold']
+        if name in fonts:
+            return fonts[name]
+    return fonts['helvetica-bold' if bold else 'helvetica']
+
+
+def typeface(family=None):
+    """
+    Return the typeface to draw text in for a CSS font-family list, so that
+    it has the metrics that measure() used. This is the first family that has
+    metrics, or if that is a generic family (e.g. sans-serif) or there is
+    none, the family of the font measured instead (e.g. "Helvetica").
+    """
+    try:
+        return typefaces[family]
+    except KeyError:
+        pass
+    result = fonts['helvetica'].family
+    for name in (family or '').split(','):
+        name = name.strip().strip('"\'')
+        key = aliases.get(name.lower(), name.lower())
+        if key in fonts:
+            result = fonts[key].family if name.lower() in generic else name
+            break
+    if len(typefaces) >= 1024:
+        typefaces.clear()
+    typefaces[family] = result
+    return result
+
+typefaces = {}
+
+
+def measure(text, family=None, size=16, bold=False):
+    """
+    Return the (width, height) of a line of text in the units of size.
+    family is a CSS font-family list.
+    """
+    key = (text, family, size, bold)
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    result = (font(family, bold).width(text) * size / 1000.0, size * line_height)
+    # Empty the cache when full, rather than track which labels are oldest
+    if len(cache) >= cache_size:
+        cache.clear()
+    cache[key] = result
+    return result
+
+# A plain dict, since a lookup must cost less than summing a few widths
+cache, cache_size = {}, 16384
@@ -2,12 +2,16 @@
 Python interface to PresentationML (Office Open XML for PowerPoint 2007+)
 """
 
+import os
+import zipfile
+import tempfile
+import posixpath
+import threading
+from copy import copy
+from contextlib import contextmanager
 from lxml import etree, objectify
 from lxml.builder import ElementMaker
-
-_globals = {
-    'shape': 0,
-}
+from collections import OrderedDict
 
 # from pptx.shapes import _nsmap as nsmap
 nsmap = {
@@ -20,9 +24,343 @@ a = ElementMaker(namespace=nsmap['a'], nsmap=nsmap)
 p = ElementMaker(namespace=nsmap['p'], nsmap=nsmap)
 r = ElementMaker(namespace=nsmap['r'], nsmap=nsmap)
 
+def slide_size(slide, default=(9144000, 6858000)):
+    """
+    Return the (width, height) in EMU of the presentation a slide belongs to,
+    or the default if it cannot be found (e.g. if slide is not a pptx slide).
+    """
+    for attrs in (('package', 'presentation'),                 # python-pptx 0.3
+                  ('part', 'package', 'presentation_part')):   # python-pptx 0.6+
+        obj = slide
+        try:
+            for attr in attrs:
+                obj = getattr(obj, attr)
+            size = obj._element.find('p:sldSz', namespaces=nsmap)
+        except AttributeError:
+            continue
+        if size is not None:
+            return int(size.get('cx')), int(size.get('cy'))
+    return default
+
+def shape_tree(slide):
+    """
+    Return the p:spTree to add shapes to on a python-pptx slide. Returns slide
+    itself if it is not a python-pptx slide (e.g. a p:spTree or SlideWriter).
+    """
+    if hasattr(slide, '_element'):
+        return slide._element.find('.//p:spTree', namespaces=nsmap)
+    return slide
+
 def xmlns(*prefixes):
     return ' '.join('xmlns:%s="%s"' % (p, nsmap[p]) for p in prefixes)
 
+
+class _Prototype(object):
+    """
+    A %-formatted XML template that is parsed only once. Each %s placeholder
+    is described by a (path, attribute) field, where path is relative to the
+    root element. For example:
+
+        make = _Prototype(_shape, ('p:nvSpPr/p:cNvPr', 'id'), ...)
+        make(1, ...)    # same as objectify.fromstring(_shape % (1, ...))
+
+    Calling the prototype sets the placeholder attributes on the parsed tree
+    and returns a copy of it, which is much faster than re-parsing. (Copying
+    an lxml element always copies its whole subtree.)
+    """
+    def __init__(self, template, *fields):
+        self.tree = objectify.fromstring(template % (('',) * len(fields)))
+        self.fields = [(self.tree.find(path, namespaces=nsmap).attrib, attr)
+                       for path, attr in fields]
+        self.lock = threading.Lock()
+
+    def __call__(self, *values):
+        with self.lock:
+            for (attrib, attr), value in zip(self.fields, values):
+                attrib[attr] = '%s' % value
+            return copy(self.tree)
+
+
+class LRUCache(object):
+    """
+    A thread-safe mapping that holds up to maxsize items, discarding the least
+    recently used item when full. Lookups via .get() are counted as hits or
+    misses. For example:
+
+        cache = LRUCache(maxsize=2)
+        cache['a'] = 1
+        cache.get('a')          # 1
+        cache.get('b')          # None
+        cache.info()            # {'hits': 1, 'misses': 1, 'size': 1, ...}
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                value = self.data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.data[key] = value
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = value
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def __len__(self):
+        return len(self.data)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self.data), 'maxsize': self.maxsize}
+
+
+class IdAllocator(object):
+    """
+    Allocates shape ids. Shape ids must be unique within a slide, so use one
+    allocator per slide. It is safe to share an allocator between threads.
+    For example:
+
+        ids = IdAllocator(start=2)
+        shape('rect', 0, 0, 100, 100, ids=ids)      # has id 2
+        shape('rect', 0, 0, 100, 100, ids=ids)      # has id 3
+    """
+    def __init__(self, start=1):
+        self.next = start
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        """Return the next id"""
+        with self.lock:
+            id = self.next
+            self.next += 1
+        return id
+
+    @classmethod
+    def after(cls, tree):
+        """Return an allocator that starts after the largest id in tree"""
+        ids = [int(id) for id in tree.xpath('.//p:cNvPr/@id', namespaces=nsmap)]
+        return cls(max(ids) + 1 if ids else 1)
+
+    @classmethod
+    def of(cls, tree):
+        """
+        Return the allocator of tree if it has one (e.g. a SlideWriter), else
+        one that starts after the largest id in tree
+        """
+        return getattr(tree, 'ids', None) or cls.after(tree)
+
+# Allocates ids for shapes created without an allocator
+_ids = IdAllocator()
+
+
+class SlideWriter(object):
+    """
+    Writes a slide part (p:sld) to a file one shape at a time, so that the
+    slide's shapes need not be held in memory together. It can be used in
+    place of a p:spTree. For example:
+
+        with SlideWriter('slide1.xml') as slide:
+            slide.append(shape('rect', 0, 0, 100, 100, ids=slide.ids))
+            svg2mso(slide, svg, size=(9144000, 6858000))
+
+    output is a file name or a file-like object. New slides have just the
+    shape tree's group shape, with id 1, so ids start from 2. .count has the
+    number of shapes written.
+    """
+    def __init__(self, output, ids=None):
+        self.output = output
+        self.ids = IdAllocator(2) if ids is None else ids
+        self.count = 0
+
+    def __enter__(self):
+        self.contexts = []
+        self.xf = self._enter(etree.xmlfile(self.output, encoding='UTF-8'))
+        self.xf.write_declaration(standalone=True)
+        for tag in ('p:sld', 'p:cSld', 'p:spTree'):
+            self._enter(self.xf.element(
+                '{%s}%s' % (nsmap['p'], tag[2:]), nsmap=nsmap if tag == 'p:sld' else None))
+        self.xf.write(p.nvGrpSpPr(p.cNvPr(id='1', name=''), p.cNvGrpSpPr(), p.nvPr()))
+        self.xf.write(p.grpSpPr())
+        return self
+
+    def _enter(self, context):
+        self.contexts.append(context)
+        return context.__enter__()
+
+    def append(self, shape):
+        """Write a shape to the slide"""
+        self.xf.write(shape)
+        self.count += 1
+
+    def __exit__(self, *exc_info):
+        # Close p:spTree and p:cSld, add the colour map, then close p:sld
+        while len(self.contexts) > 2:
+            self.contexts.pop().__exit__(*exc_info)
+        if exc_info[0] is None:
+            self.xf.write(p.clrMapOvr(a.masterClrMapping()))
+        while self.contexts:
+            self.contexts.pop().__exit__(*exc_info)
+
+
+# Namespaces and types of package parts
+_pkg = {
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+    'ct': 'http://schemas.openxmlformats.org/package/2006/content-types',
+}
+_slide_rel = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide'
+_slide_layout_rel = _slide_rel + 'Layout'
+_slide_type = 'application/vnd.openxmlformats-officedocument.presentationml.slide+xml'
+
+
+def _rels_name(part):
+    """Return the name of the relationships part for a part"""
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, '_rels', name + '.rels')
+
+
+def _target(part, rels, id):
+    """Return the name of the part that relationship id in rels points to"""
+    rel = rels.find('{%s}Relationship[@Id="%s"]' % (_pkg['rel'], id))
+    target = posixpath.join(posixpath.dirname(part), rel.get('Target'))
+    return posixpath.normpath(target).lstrip('/')
+
+
+class PackageWriter(object):
+    """
+    Writes a PPTX file one slide at a time, so that memory use does not grow
+    with the number of slides. The template's parts (layouts, masters, theme,
+    etc.) are copied once. Each slide is written to the file as it is added.
+    For example:
+
+        with PackageWriter('deck.pptx', 'layout15x12.pptx') as deck:
+            for svg in svgs:
+                with deck.slide() as slide:
+                    svg2mso(slide, svg, size=deck.size)
+
+    template is a PPTX file name or file, and defaults to python-pptx's
+    default template. Slides use the template's layout'th slide layout. 6 is
+    usually blank. .size is the slide (width, height) in EMU, and .count is
+    the number of slides added.
+    """
+    def __init__(self, output, template=None, layout=6):
+        if template is None:
+            import pptx
+            template = os.path.join(os.path.dirname(pptx.__file__), 'templates', 'default.pptx')
+        self.output, self.template, self.layout = output, template, layout
+        self.count = 0
+
+    def __enter__(self):
+        self.source = zipfile.ZipFile(self.template)
+        self.zip = zipfile.ZipFile(self.output, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+        read = lambda name: etree.fromstring(self.source.read(name))
+        self.types = read('[Content_Types].xml')
+        rels = read('_rels/.rels')
+        main = _target('', rels, [rel.get('Id') for rel in rels
+                                  if rel.get('Type').endswith('/officeDocument')][0])
+        self.presentation, self.presentation_rels = main, _rels_name(main)
+        self.pres, self.rels = read(main), read(self.presentation_rels)
+        size = self.pres.find('p:sldSz', namespaces=nsmap)
+        self.size = int(size.get('cx')), int(size.get('cy'))
+
+        # Find the slide layout via the first slide master
+        master_id = self.pres.find('p:sldMasterIdLst/p:sldMasterId', namespaces=nsmap)
+        master = _target(main, self.rels, master_id.get('{%s}id' % nsmap['r']))
+        master_rels = read(_rels_name(master))
+        layout_id = read(master).findall(
+            'p:sldLayoutIdLst/p:sldLayoutId', namespaces=nsmap)[self.layout]
+        layout = _target(master, master_rels, layout_id.get('{%s}id' % nsmap['r']))
+        self.slide_rels = (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="%s"><Relationship Id="rId1" Type="%s" Target="%s"/>'
+            '</Relationships>' % (_pkg['rel'], _slide_layout_rel,
+                                  posixpath.relpath(layout, 'ppt/slides')))
+
+        # Copy the template, except the parts that list slides
+        names = self.source.namelist()
+        for name in names:
+            if name not in ('[Content_Types].xml', main, self.presentation_rels):
+                self.zip.writestr(self.source.getinfo(name), self.source.read(name))
+        self.slide_number = max([0] + [
+            int(name[len('ppt/slides/slide'):-len('.xml')]) for name in names
+            if name.startswith('ppt/slides/slide') and name.endswith('.xml')])
+
+        # New slide ids and relationship ids follow the template's
+        self.slide_ids = self.pres.find('p:sldIdLst', namespaces=nsmap)
+        if self.slide_ids is None:
+            self.slide_ids = etree.Element('{%s}sldIdLst' % nsmap['p'])
+            before = self.pres.find('p:sldSz', namespaces=nsmap)
+            before.addprevious(self.slide_ids)
+        self.slide_id = max([255] + [int(e.get('id')) for e in self.slide_ids])
+        self.rel_id = max([0] + [int(e.get('Id')[3:]) for e in self.rels
+                                 if e.get('Id', '').startswith('rId')])
+        return self
+
+    def write(self, xml):
+        """Add a slide from its p:sld XML string"""
+        self.zip.writestr(self._add(), xml)
+
+    def _add(self):
+        """Add a new slide to the presentation, and return its part name"""
+        self.slide_number += 1
+        part = 'ppt/slides/slide%d.xml' % self.slide_number
+        self.zip.writestr(_rels_name(part), self.slide_rels)
+
+        # Add the slide to the presentation and content types
+        self.slide_id += 1
+        self.rel_id += 1
+        etree.SubElement(self.rels, '{%s}Relationship' % _pkg['rel'], Id='rId%d' % self.rel_id,
+                         Type=_slide_rel, Target=posixpath.relpath(part, 'ppt'))
+        etree.SubElement(self.slide_ids, '{%s}sldId' % nsmap['p'], id=str(self.slide_id)).set(
+            '{%s}id' % nsmap['r'], 'rId%d' % self.rel_id)
+        etree.SubElement(self.types, '{%s}Override' % _pkg['ct'], PartName='/' + part,
+                         ContentType=_slide_type)
+        self.count += 1
+        return part
+
+    @contextmanager
+    def slide(self, ids=None):
+        """
+        Add a slide. Yields a SlideWriter to append shapes to. The slide is
+        written to a temporary file, then copied into the PPTX.
+        """
+        handle, filename = tempfile.mkstemp(suffix='.xml')
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                with SlideWriter(output, ids) as slide:
+                    yield slide
+            self.zip.write(filename, self._add())
+        finally:
+            os.remove(filename)
+
+    def __exit__(self, *exc_info):
+        try:
+            if exc_info[0] is None:
+                for name, tree in ((self.presentation, self.pres),
+                                   (self.presentation_rels, self.rels),
+                                   ('[Content_Types].xml', self.types)):
+                    self.zip.writestr(name, etree.tostring(
+                        tree, xml_declaration=True, encoding='UTF-8', standalone=True))
+        finally:
+            self.zip.close()
+            self.source.close()
+
+
 _shape = '<p:sp ' + xmlns('p', 'a') + ('>'
     '  <p:nvSpPr>'
     '    <p:cNvPr id="%s" name="%s"/>'
@@ -40,7 +378,19 @@ _shape = '<p:sp ' + xmlns('p', 'a') + ('>'
     '  </p:spPr>'
     '</p:sp>')
 
-def shape(geom, x, y, w, h):
+_shape_fields = (
+    ('p:nvSpPr/p:cNvPr', 'id'),
+    ('p:nvSpPr/p:cNvPr', 'name'),
+    ('p:spPr/a:xfrm/a:off', 'x'),
+    ('p:spPr/a:xfrm/a:off', 'y'),
+    ('p:spPr/a:xfrm/a:ext', 'cx'),
+    ('p:spPr/a:xfrm/a:ext', 'cy'),
+)
+_shape_prototype = _Prototype(_shape, *(_shape_fields + (
+    ('p:spPr/a:prstGeom', 'prst'),
+)))
+
+def shape(geom, x, y, w, h, ids=None):
     """
     Return a new shape object. For example:
 
@@ -48,10 +398,13 @@ def shape(geom, x, y, w, h):
 
     Popular shapes include: 'line', 'rect', 'roundRect' and 'ellipse'.
 
+    ids is the IdAllocator for the slide. This defaults to a process-wide
+    allocator, which gives unique but not repeatable ids.
+
     Refer <http://msdn.microsoft.com/en-us/library/documentformat.openxml.drawing.shapetypevalues(v=office.14).aspx>
     """
-    id = _globals['shape'] = _globals['shape'] + 1
-    shp = objectify.fromstring(_shape % (id, 'Shape %d' % id, x, y, w, h, geom))
+    id = (_ids if ids is None else ids)()
+    shp = _shape_prototype(id, 'Shape %d' % id, x, y, w, h, geom)
     # setattr(shp, 'pr', shp.find('.//p:spPr', namespaces=nsmap))
     return shp
 
@@ -76,11 +429,44 @@ _cstmshape = '<p:sp ' + xmlns('p', 'a') + ('>'
     '  </p:spPr>'
     '</p:sp>')
 
-def cust_shape(x, y, w, h):
-    id = _globals['shape'] = _globals['shape'] + 1
-    shp = objectify.fromstring(_cstmshape % (id, 'Freeform %d' %id, x, y, w, h))
+_cstmshape_prototype = _Prototype(_cstmshape, *_shape_fields)
+
+def cust_shape(x, y, w, h, ids=None):
+    id = (_ids if ids is None else ids)()
+    shp = _cstmshape_prototype(id, 'Freeform %d' % id, x, y, w, h)
     return shp
 
+_path_commands = {
+    'M': ('<a:moveTo><a:pt x="%d" y="%d"/></a:moveTo>', 2),
+    'L': ('<a:lnTo><a:pt x="%d" y="%d"/></a:lnTo>', 2),
+    'C': ('<a:cubicBezTo><a:pt x="%d" y="%d"/><a:pt x="%d" y="%d"/>'
+          '<a:pt x="%d" y="%d"/></a:cubicBezTo>', 6),
+    'Q': ('<a:quadBezTo><a:pt x="%d" y="%d"/><a:pt x="%d" y="%d"/></a:quadBezTo>', 4),
+    'A': ('<a:arcTo wR="%d" hR="%d" stAng="%d" swAng="%d"/>', 4),
+    'Z': ('<a:close/>', 0),
+}
+
+def path(commands, coords, w, h):
+    """
+    Return a new a:path object for a custom shape. For example:
+
+        path('MLLZ', [0, 0, 100, 0, 100, 100], w=100, h=100)
+
+    commands is a string of M (move to), L (line to), C (cubic Bezier to), Q
+    (quadratic Bezier to), A (arc to) and Z (close). coords has the x, y of
+    each point: 1 point for M and L, 3 for C and 2 for Q. A takes 4 values:
+    the arc's width and height radius, start angle and swing angle, with
+    angles in 60,000ths of a degree. The path is built as a single string and
+    parsed once.
+    """
+    xml, i = ['<a:path %s w="%d" h="%d">' % (xmlns('a'), w, h)], 0
+    for cmd in commands:
+        template, n = _path_commands[cmd]
+        xml.append(template % tuple(coords[i:i + n]))
+        i += n
+    xml.append('</a:path>')
+    return objectify.fromstring(''.join(xml))
+
 _table = '<p:graphicFrame ' + xmlns('p', 'a', 'r') + ('>'
     '<p:nvGraphicFramePr>'
     '  <p:cNvPr id="%s" name="%s"/>'
@@ -111,11 +497,82 @@ _table = '<p:graphicFrame ' + xmlns('p', 'a', 'r') + ('>'
     '    </a:graphic>'
     '  </p:graphicFrame>')
 
-def cust_table(x, y, w, h):
-    id = _globals['shape'] = _globals['shape'] + 1
-    shp = objectify.fromstring(_table % (id, 'Table %d' %id, x, y, w, h))
+_table_prototype = _Prototype(_table,
+    ('p:nvGraphicFramePr/p:cNvPr', 'id'),
+    ('p:nvGraphicFramePr/p:cNvPr', 'name'),
+    ('p:xfrm/a:off', 'x'),
+    ('p:xfrm/a:off', 'y'),
+    ('p:xfrm/a:ext', 'cx'),
+    ('p:xfrm/a:ext', 'cy'),
+)
+
+def cust_table(x, y, w, h, ids=None):
+    id = (_ids if ids is None else ids)()
+    shp = _table_prototype(id, 'Table %d' % id, x, y, w, h)
     return shp
 
+# A table cell, with attributes (e.g. ' gridSpan="2"'), font size and text.
+# Rows of cells are formatted as strings and parsed together. See table_rows()
+_table_cell = ('<a:tc%s><a:txBody><a:bodyPr/><a:lstStyle/><a:p><a:r>'
+    '<a:rPr lang="en-US" sz="%d" dirty="0"/><a:t>%s</a:t>'
+    '</a:r></a:p></a:txBody><a:tcPr/></a:tc>')
+
+def table_rows(rows):
+    """
+    Return a list of new a:tr objects from a list of (height, cells) rows,
+    where cells is a list of (attributes, font size, escaped text) tuples.
+    All rows are parsed at once. For example:
+
+        table_rows([(370840, [('', 1200, 'Name'), (' gridSpan="2"', 1200, 'Total')])])
+    """
+    xml = ['<a:tbl %s>' % xmlns('a')]
+    for height, cells in rows:
+        xml.append('<a:tr h="%d">' % height)
+        xml.extend(_table_cell % cell for cell in cells)
+        xml.append('</a:tr>')
+    xml.append('</a:tbl>')
+    return objectify.fromstring(''.join(xml)).getchildren()
+
+_group = '<p:grpSp ' + xmlns('p', 'a') + ('>'
+    '<p:nvGrpSpPr>'
+    '  <p:cNvPr id="%s" name="%s"/>'
+    '  <p:cNvGrpSpPr/>'
+    '  <p:nvPr/>'
+    '</p:nvGrpSpPr>'
+    '<p:grpSpPr>'
+    '  <a:xfrm>'
+    '    <a:off x="%s" y="%s"/>'
+    '    <a:ext cx="%s" cy="%s"/>'
+    '    <a:chOff x="%s" y="%s"/>'
+    '    <a:chExt cx="%s" cy="%s"/>'
+    '  </a:xfrm>'
+    '</p:grpSpPr>'
+    '</p:grpSp>')
+
+_group_prototype = _Prototype(_group,
+    ('p:nvGrpSpPr/p:cNvPr', 'id'),
+    ('p:nvGrpSpPr/p:cNvPr', 'name'),
+    ('p:grpSpPr/a:xfrm/a:off', 'x'),
+    ('p:grpSpPr/a:xfrm/a:off', 'y'),
+    ('p:grpSpPr/a:xfrm/a:ext', 'cx'),
+    ('p:grpSpPr/a:xfrm/a:ext', 'cy'),
+    ('p:grpSpPr/a:xfrm/a:chOff', 'x'),
+    ('p:grpSpPr/a:xfrm/a:chOff', 'y'),
+    ('p:grpSpPr/a:xfrm/a:chExt', 'cx'),
+    ('p:grpSpPr/a:xfrm/a:chExt', 'cy'),
+)
+
+def group(x, y, w, h, child, ids=None):
+    """
+    Return a new empty group shape at (x, y, w, h). Append shapes to it.
+    child is the (x, y, w, h) of the children's co-ordinates that maps to
+    the group's position, which scales and moves the children.
+    """
+    id = (_ids if ids is None else ids)()
+    return _group_prototype(*((id, 'Group %d' % id, x, y, w, h) + tuple(child)))
+
+color_cache = LRUCache(maxsize=1024)
+
 def color(schemeClr=None, srgbClr=None, prstClr=None, hslClr=None, sysClr=None, scrgbClr=None, **mod):
     """
     Return a new color object.
@@ -159,23 +616,35 @@ def color(schemeClr=None, srgbClr=None, prstClr=None, hslClr=None, sysClr=None,
     - shade    : '10%' is 10% of input color, 90% black
     - tint     : '10%' is 10% of input color, 90% white
 
+    Modifiers are applied in alphabetical order. Colors are cached in
+    ``color_cache``: repeated calls return a copy of the cached element. Use
+    ``color_cache.info()`` for the hit and miss counts.
+
     Refer <http://msdn.microsoft.com/en-in/library/documentformat.openxml.drawing(v=office.14).aspx>
     """
+    for kind, value in (('schemeClr', schemeClr), ('srgbClr', srgbClr),
+                        ('prstClr', prstClr), ('hslClr', hslClr),
+                        ('sysClr', sysClr), ('scrgbClr', scrgbClr)):
+        if value:
+            break
+    if isinstance(value, list):
+        value = tuple(value)
+    key = (kind, value, tuple(sorted(mod.items())))
+    clr = color_cache.get(key)
+    if clr is None:
+        clr = color_cache[key] = _color(kind, value, key[-1])
+    return copy(clr)
+
+def _color(kind, value, mod):
     ns = xmlns('a')
-    if schemeClr:
-        s = '<a:schemeClr %s val="%s"/>' % (ns, schemeClr)
-    elif srgbClr:
-        s = '<a:srgbClr %s val="%s"/>' % (ns, srgbClr)
-    elif prstClr:
-        s = '<a:prstClr %s val="%s"/>' % (ns, prstClr)
-    elif hslClr:
-        s = '<a:hslClr %s hue="%.0f" sat="%.2f%%" lum="%.2f%%"/>' % ((ns,) + tuple(hslClr))
-    elif sysClr:
-        s = '<a:sysClr %s val="%s"/>' % (ns, sysClr)
-    elif scrgbClr:
-        s = '<a:scrgbClr %s r="%.0f" g="%.0f" b="%.0f"/>' % ((ns,) + tuple(scrgbClr))
+    if kind == 'hslClr':
+        s = '<a:hslClr %s hue="%.0f" sat="%.2f%%" lum="%.2f%%"/>' % ((ns,) + tuple(value))
+    elif kind == 'scrgbClr':
+        s = '<a:scrgbClr %s r="%.0f" g="%.0f" b="%.0f"/>' % ((ns,) + tuple(value))
+    else:
+        s = '<a:%s %s val="%s"/>' % (kind, ns, value)
     color = objectify.fromstring(s)
-    for arg, val in mod.iteritems():
+    for arg, val in mod:
         if val is True:
             color.append(etree.fromstring('<a:%s %s/>' % (arg, ns)))
         else:
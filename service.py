@@ -0,0 +1,211 @@
+"""
+Converts SVGs to PPTX as a long-running service, so that each conversion
+does not pay for starting Python, importing modules and loading the layout.
+
+Usage: python service.py [--socket PATH] [--jobs N] [--max-pending N]
+                         [--layout layout15x12.pptx] [--cache DIR]
+
+Reads jobs from stdin, or from connections to a Unix socket if --socket is
+specified. Each job is one line of JSON. Each result is written back as one
+line of JSON, in the order the jobs finish. For example:
+
+    {"id": 1, "svg": ["a.svg", "b.svg"], "output": "out.pptx", "merge": 100}
+    {"id": 1, "output": "out.pptx", "slides": 2, "shapes": 412, "failed": 0,
+     "errors": [], "wait_ms": 0.1, "convert_ms": 38.2, "total_ms": 52.7}
+
+Jobs may include the build.build options stream, merge, simplify (in pixels)
+and compact. If more than max-pending jobs are in progress, new jobs are
+rejected with {"id": ..., "error": "busy"}, and should be retried later.
+{"command": "stats"} returns the number of jobs, failures, rejections and
+jobs in progress, and the 50th, 90th and 99th percentile latency in ms.
+"""
+import sys
+import json
+import time
+import threading
+import traceback
+from io import BytesIO
+from collections import deque
+import build
+from pypptx import p
+from svg2pptx import svg2mso, emu_per_pixel
+
+# Keyword arguments that jobs may pass to build.build
+job_options = ('stream', 'merge', 'simplify', 'compact')
+
+# Drawn by each worker process when it starts, to warm it up
+warmup = ('<svg><rect width="10" height="10" fill="red"/><circle r="5" stroke="blue"/>'
+          '<path d="M0,0 L10,10"/><text x="5" y="5">warm</text></svg>')
+
+
+def warm():
+    """Prepare a worker process, by drawing a small SVG"""
+    svg2mso(p.spTree(), warmup, size=(9144000, 6858000))
+
+
+class Service(object):
+    """
+    Runs build.build jobs on a pool of worker processes that are started, and
+    warmed up, once. Up to max_pending jobs may run at a time. Keeps the
+    latency of the last latencies jobs. It is safe to call run() from many
+    threads.
+    """
+    def __init__(self, layout='layout15x12.pptx', jobs=2, max_pending=16, cache=None,
+                 latencies=1000):
+        from multiprocessing import Pool
+        with open(layout, 'rb') as handle:
+            self.layout = handle.read()
+        self.cache = cache
+        self.pool = Pool(jobs, initializer=warm)
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.jobs = self.failed = self.rejected = self.active = 0
+        self.latencies = deque(maxlen=latencies)
+
+    def run(self, job):
+        """Run a job (a dict) and return its result (a dict)"""
+        # The job is enqueued now. It waits until a worker starts its first file
+        start = time.time()
+        result = {'id': job.get('id')}
+        if job.get('command') == 'stats':
+            result.update(self.stats())
+            return result
+        if not self.pending.acquire(False):
+            with self.lock:
+                self.rejected += 1
+            result['error'] = 'busy'
+            return result
+        with self.lock:
+            self.active += 1
+        try:
+            svgfiles = job['svg']
+            svgfiles = [svgfiles] if isinstance(svgfiles, basestring) else svgfiles
+            options = dict((key, job[key]) for key in job_options if key in job)
+            options['simplify'] = options.get('simplify', 0) * emu_per_pixel
+            reports = build.build(svgfiles, job['output'], layout=BytesIO(self.layout),
+                                  pool=self.pool, cache=self.cache, **options)
+            errors = [report['error'] for report in reports if report['error'] is not None]
+            starts = [report['start'] for report in reports]
+            result.update({
+                'output': job['output'],
+                'slides': len(reports) - len(errors),
+                'shapes': sum(report['shapes'] for report in reports),
+                'failed': len(errors),
+                'errors': errors,
+                'wait_ms': (min(starts) - start) * 1000 if starts else 0,
+                'convert_ms': sum(report['time'] for report in reports) * 1000,
+            })
+        except Exception:
+            result['error'] = traceback.format_exc()
+        finally:
+            self.pending.release()
+        result['total_ms'] = (time.time() - start) * 1000
+        with self.lock:
+            self.active -= 1
+            self.jobs += 1
+            self.failed += 1 if result.get('error') or result.get('failed') else 0
+            self.latencies.append(result['total_ms'])
+        return result
+
+    def handle(self, line):
+        """Run a job from a line of JSON, and return its result as a line of JSON"""
+        try:
+            job = json.loads(line)
+        except ValueError:
+            return json.dumps({'id': None, 'error': 'invalid JSON'}) + '\n'
+        return json.dumps(self.run(job)) + '\n'
+
+    def stats(self):
+        """Return counts of jobs, and percentiles of their latency in ms"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = {'jobs': self.jobs, 'failed': self.failed, 'rejected': self.rejected,
+                     'active': self.active}
+        for percentile in (50, 90, 99):
+            stats['p%d_ms' % percentile] = (
+                latencies[min(len(latencies) - 1, len(latencies) * percentile / 100)]
+                if latencies else None)
+        return stats
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
+def serve_stdin(service, input=sys.stdin, output=sys.stdout):
+    """Run each line of input as a job in a thread, and write results to output"""
+    lock, threads = threading.Lock(), []
+
+    def respond(line):
+        result = service.handle(line)
+        with lock:
+            output.write(result)
+            output.flush()
+
+    # Use readline: iterating over a pipe in Python 2 waits for a full buffer
+    for line in iter(input.readline, ''):
+        if line.strip():
+            thread = threading.Thread(target=respond, args=(line,))
+            thread.start()
+            threads.append(thread)
+            threads = [thread for thread in threads if thread.is_alive()]
+    for thread in threads:
+        thread.join()
+
+
+def serve_socket(service, path):
+    """Run jobs sent to a Unix socket at path. Each connection runs in a thread"""
+    import os
+    import SocketServer
+
+    class Handler(SocketServer.StreamRequestHandler):
+        def handle(self):
+            for line in iter(self.rfile.readline, ''):
+                if line.strip():
+                    self.wfile.write(service.handle(line))
+                    self.wfile.flush()
+
+    class Server(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+        daemon_threads = True
+
+    if os.path.exists(path):
+        os.remove(path)
+    server = Server(path, Handler)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', default=None,
+        help='Unix socket to listen on (default: read stdin)')
+    parser.add_argument('--jobs', type=int, default=2,
+        help='Number of worker processes (default: 2)')
+    parser.add_argument('--max-pending', type=int, default=16,
+        help='Number of jobs to run at once before rejecting jobs (default: 16)')
+    parser.add_argument('--layout', default='layout15x12.pptx',
+        help='PPTX file to use to create blank slides')
+    parser.add_argument('--cache', default=None,
+        help='Directory to cache converted slides in')
+    args = parser.parse_args()
+
+    import signal
+
+    service = Service(args.layout, args.jobs, args.max_pending, args.cache)
+    # Stop cleanly when killed, e.g. by a process manager
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if args.socket:
+            serve_socket(service, args.socket)
+        else:
+            serve_stdin(service)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,199 @@
+"""
+Records the shapes drawn from an SVG as compact columns of numbers, between
+converting the SVG and writing DrawingML.
+
+    ir = svg2ir(etree.parse('chart.svg'), size=(9144000, 6858000))  # convert
+    data = cPickle.dumps(ir, -1)                            # e.g. in a worker
+    ir2mso(slide, cPickle.loads(data))                      # write the shapes
+
+svg2ir() draws the same shapes as svg2pptx.svg2mso(), but as rows of a
+ShapeIR instead of lxml elements. A row takes about 60 bytes, plus 8 per
+path point, and a ShapeIR pickles as a few binary strings. ir2mso() writes
+the rows as the same XML that svg2mso() would, except that shapes copied by
+<use> are converted afresh, so may differ by rounding.
+"""
+from array import array
+from copy import copy
+from pypptx import IdAllocator, shape_tree
+from svg2pptx import Draw, sppr_key, sppr_children, preset_shape, freeform_shape, text_shape
+from svg2pptx import _dimensions, _run
+
+
+class ShapeIR(object):
+    """
+    Shapes, as columns. Row i is a shape of kind kinds[kind[i]]: a preset
+    geometry (e.g. 'ellipse'), 'freeform' or 'text'. Its slide box is (x[i],
+    y[i], w[i], h[i]) in EMU, rotated clockwise by rotation[i] degrees.
+    flags[i] has FLIP if it is flipped vertically, and UNFILLED if its paths
+    are not filled.
+
+    style[i] indexes styles, which has each distinct svg2pptx.sppr_key(), or
+    for text, each (size, bold, rgb, align, anchor, typeface). It is -1 if
+    unstyled.
+
+    A freeform's paths are ref[i] to ref[i] + count[i]. Path j's commands
+    start at path_commands[j] in commands, and its points (relative to the
+    shape's x, y) at path_points[j] in points. For text, ref[i] indexes texts.
+    """
+    __slots__ = ('kind', 'x', 'y', 'w', 'h', 'rotation', 'flags', 'style', 'ref', 'count',
+                 'path_commands', 'path_points', 'commands', 'points',
+                 'kinds', 'styles', 'texts', '_ids')
+    FLIP, UNFILLED = 1, 2
+
+    def __init__(self):
+        self.kind, self.flags = array('B'), array('B')
+        self.x, self.y, self.w, self.h = array('d'), array('d'), array('d'), array('d')
+        self.rotation = array('d')
+        self.style, self.ref, self.count = array('i'), array('i'), array('i')
+        self.path_commands, self.path_points = array('i'), array('i')
+        self.commands, self.points = array('c'), array('d')
+        self.kinds, self.styles, self.texts = ['freeform', 'text'], [], []
+        self._index()
+
+    def _index(self):
+        # Map kinds and styles to their index, to add each only once
+        self._ids = dict((key, i) for i, key in enumerate(self.kinds))
+        self._ids.update(((None, key), i) for i, key in enumerate(self.styles))
+
+    def __len__(self):
+        return len(self.kind)
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__[:-1])
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+        self._index()
+
+    def intern(self, key, kind=False):
+        """Return the index of a style (or if kind is true, a kind), adding it if new"""
+        values = self.kinds if kind else self.styles
+        key_id = key if kind else (None, key)
+        index = self._ids.get(key_id)
+        if index is None:
+            index = self._ids[key_id] = len(values)
+            values.append(key)
+        return index
+
+    def add(self, kind, x, y, w, h, rotation=0, flags=0, style=-1, ref=-1, count=0):
+        """Add a shape, and return its row"""
+        self.kind.append(self.intern(kind, kind=True))
+        self.x.append(x)
+        self.y.append(y)
+        self.w.append(w)
+        self.h.append(h)
+        self.rotation.append(rotation)
+        self.flags.append(flags)
+        self.style.append(style)
+        self.ref.append(ref)
+        self.count.append(count)
+        return len(self.kind) - 1
+
+    def add_path(self, commands, points):
+        """Add a path for a freeform, and return its index"""
+        self.path_commands.append(len(self.commands))
+        self.path_points.append(len(self.points))
+        self.commands.fromstring(commands)
+        self.points.extend(points)
+        return len(self.path_commands) - 1
+
+    def paths(self, row):
+        """Return the (commands, points) of each path of a freeform row"""
+        paths, end = [], len(self.path_commands)
+        for j in xrange(self.ref[row], self.ref[row] + self.count[row]):
+            c1 = self.path_commands[j + 1] if j + 1 < end else len(self.commands)
+            p1 = self.path_points[j + 1] if j + 1 < end else len(self.points)
+            paths.append((self.commands[self.path_commands[j]:c1].tostring(),
+                          self.points[self.path_points[j]:p1]))
+        return paths
+
+    def nbytes(self):
+        """Return the bytes used by the columns and text"""
+        return (sum(len(column) * column.itemsize for column in (
+                    self.kind, self.x, self.y, self.w, self.h, self.rotation, self.flags,
+                    self.style, self.ref, self.count, self.path_commands, self.path_points,
+                    self.commands, self.points)) +
+                sum(len(text) for text in self.texts))
+
+
+class Record(Draw):
+    """
+    Draws an SVG into a ShapeIR instead of onto a slide. <use> copies are
+    converted afresh, since rows cannot be copied.
+    """
+    copies = False
+
+    def __init__(self, ir, width, height, size=None, **options):
+        Draw.__init__(self, ir, width, height, size, ids=IdAllocator(), **options)
+        self.ir = ir
+
+    def _new_preset(self, geom, x, y, w, h, rotation=0, flip=False):
+        return self.ir.add(geom, x, y, w, h, rotation, ShapeIR.FLIP if flip else 0)
+
+    def _new_freeform(self, x, y, w, h, paths, filled=True):
+        ir = self.ir
+        first = len(ir.path_commands)
+        for commands, points in paths:
+            ir.add_path(commands, points)
+        return ir.add('freeform', x, y, w, h, flags=0 if filled else ShapeIR.UNFILLED,
+                      ref=first, count=len(paths))
+
+    def _new_text(self, x, y, w, h, rotation, text, size, bold, rgb, align, anchor, typeface):
+        ir = self.ir
+        ir.texts.append(text)
+        return ir.add('text', x, y, w, h, rotation, style=ir.intern(
+            (size, bold, rgb, align, anchor, typeface)), ref=len(ir.texts) - 1)
+
+    def _style(self, row, tag, style):
+        self.ir.style[row] = self.ir.intern(sppr_key(tag, style, self.compact))
+        return row
+
+    def _add(self, row):
+        # Rows are added to the ShapeIR when they are created
+        pass
+
+
+def svg2ir(svg, width=940, height=None, size=None, stream=False, compact=False, merge=0,
+           simplify=0, profile=None, cull=True, fit=True):
+    """
+    Return a ShapeIR with the shapes that svg2pptx.svg2mso() draws for an SVG.
+    The options are as for svg2mso. size is the slide's (width, height) in
+    EMU, and defaults to (9144000, 6858000).
+    """
+    width, height = _dimensions(width, height)
+    ir = ShapeIR()
+    _run(Record(ir, width, height, size, compact=compact, merge=merge, simplify=simplify,
+                profile=profile, cull=cull, fit=fit), svg, stream)
+    return ir
+
+
+def ir2mso(slide, ir, ids=None):
+    """
+    Draw the shapes in a ShapeIR on a slide. slide and ids are as for
+    svg2pptx.svg2mso. Returns the number of shapes drawn.
+    """
+    tree = shape_tree(slide)
+    if ids is None:
+        ids = IdAllocator.of(tree)
+    kinds, styles = ir.kinds, ir.styles
+    for i in xrange(len(ir)):
+        kind, style = kinds[ir.kind[i]], ir.style[i]
+        x, y, w, h = int(ir.x[i]), int(ir.y[i]), int(ir.w[i]), int(ir.h[i])
+        if kind == 'text':
+            size, bold, rgb, align, anchor, typeface = styles[style]
+            tree.append(text_shape(x, y, w, h, ir.rotation[i], ir.texts[ir.ref[i]],
+                                   size, bold, rgb, align, anchor, typeface, ids))
+            continue
+        if kind == 'freeform':
+            shp = freeform_shape(x, y, w, h, ir.paths(i),
+                                 not ir.flags[i] & ShapeIR.UNFILLED, ids)
+        else:
+            shp = preset_shape(kind, x, y, w, h, ir.rotation[i],
+                               ir.flags[i] & ShapeIR.FLIP, ids)
+        if style >= 0:
+            spPr = shp.spPr
+            for child in sppr_children(styles[style]):
+                spPr.append(copy(child))
+        tree.append(shp)
+    return len(ir)
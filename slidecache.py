@@ -0,0 +1,149 @@
+"""
+Caches converted slide shapes on disk, keyed by the content of the SVG.
+
+    cache = SlideCache('.slidecache', maxsize=256 * 1024 * 1024)
+    svg2mso(slide, etree.parse('chart.svg'), cache=cache)   # converts and saves the shapes
+    svg2mso(slide, etree.parse('chart.svg'), cache=cache)   # copies the saved shapes
+    cache.info()            # {'hits': 1, 'misses': 1, 'bytes_saved': ..., ...}
+
+Keys are SHA-1 hashes of the SVG, the conversion options and the converter's
+source code, so editing the converter invalidates the cache. Each entry is a
+file, written atomically, so several processes can share a cache. When the
+cache exceeds maxsize bytes, the least recently used files are removed.
+"""
+import os
+import sys
+import hashlib
+import tempfile
+import threading
+
+# Modules whose source determines the converter's output
+converter_modules = ('pypptx', 'svgpath', 'csscolor', 'fontmetrics', 'svg2pptx')
+
+
+def converter_version():
+    """Return a hash of the converter's source code"""
+    digest = hashlib.sha1()
+    for name in converter_modules:
+        __import__(name)
+        filename = sys.modules[name].__file__
+        if filename.endswith(('.pyc', '.pyo')):
+            filename = filename[:-1]
+        with open(filename, 'rb') as handle:
+            digest.update(handle.read())
+    return digest.hexdigest()
+
+
+class SlideCache(object):
+    """
+    A directory of cached values, holding up to maxsize bytes. Values are
+    byte strings. Counts hits, misses and the bytes served from the cache.
+    It is safe to share between threads and processes.
+    """
+    suffix = '.xml'
+
+    def __init__(self, path, maxsize=256 * 1024 * 1024, version=None):
+        self.path, self.maxsize = path, maxsize
+        self.version = converter_version() if version is None else version
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.bytes_saved = 0
+        if not os.path.isdir(path):
+            try:
+                os.makedirs(path)
+            except OSError:
+                # Another process may have created it
+                if not os.path.isdir(path):
+                    raise
+        self.size = sum(size for filename, size, used in self._entries())
+
+    def key(self, *parts):
+        """Return the key for a list of byte strings or values"""
+        digest = hashlib.sha1(self.version)
+        for part in parts:
+            part = part if isinstance(part, bytes) else repr(part)
+            # Prefix each part with its length, so that parts cannot run together
+            digest.update('%d:' % len(part))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _filename(self, key):
+        return os.path.join(self.path, key + self.suffix)
+
+    def _entries(self):
+        """Return a list of (filename, size, last used time) for each entry"""
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith(self.suffix):
+                filename = os.path.join(self.path, name)
+                try:
+                    stat = os.stat(filename)
+                except OSError:
+                    continue
+                entries.append((filename, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, key, default=None):
+        """Return the value for key, or default if it is not cached"""
+        filename = self._filename(key)
+        try:
+            with open(filename, 'rb') as handle:
+                value = handle.read()
+            # Mark the entry as recently used
+            os.utime(filename, None)
+        except (IOError, OSError):
+            with self.lock:
+                self.misses += 1
+            return default
+        with self.lock:
+            self.hits += 1
+            self.bytes_saved += len(value)
+        return value
+
+    def __setitem__(self, key, value):
+        # Write to a temporary file, then rename it, so that readers never
+        # see a partly written entry
+        handle, temp = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                output.write(value)
+            if os.name == 'nt' and os.path.exists(self._filename(key)):
+                os.remove(self._filename(key))
+            os.rename(temp, self._filename(key))
+        except Exception:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        with self.lock:
+            self.size += len(value)
+            if self.size > self.maxsize:
+                self._evict()
+
+    def _evict(self):
+        """Remove the least recently used entries until the cache fits"""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        # Other processes may have changed the cache, so recount its size
+        self.size = sum(size for filename, size, used in entries)
+        for filename, size, used in entries:
+            if self.size <= self.maxsize:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            self.size -= size
+
+    def clear(self):
+        """Remove all entries"""
+        with self.lock:
+            for filename, size, used in self._entries():
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+            self.size = 0
+
+    def info(self):
+        """Return the cache's hits, misses, bytes saved, size and maxsize"""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'bytes_saved': self.bytes_saved,
+                    'size': self.size, 'maxsize': self.maxsize}
@@ -6,220 +6,961 @@ Source: https://github.com/gramener/pypptx
 Usage: python svg2pptx.py filename.svg
 """
 import re
-from lxml import etree, html
+import math
+import time
+import heapq
+import hashlib
+import types
+from io import BytesIO
+from copy import copy, deepcopy
+from lxml import etree
 from lxml.builder import ElementMaker
-from pypptx import a, p, shape, color, nsmap, cust_shape, cust_table
-from color import rgba
+from pypptx import a, p, shape, color, nsmap, cust_shape, path, slide_size, shape_tree
+from pypptx import IdAllocator, LRUCache, group
+import svgpath
+import csscolor
+import fontmetrics
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-re_ns = re.compile(r'({.*?})?(.*)')
-re_path = re.compile(r'[mMzZlLhHvVcCsSqQtTaA]|[\+\-]?[\d\.e]+')
-
-def interpret_str(val):
-    if val:
-        rn = re.compile(r'([\d\.-]+)')
-        match = rn.search(val)
-        value = match.group(1)
-        if val.startswith('-'):
-            val = str(0)
-        elif val.endswith('%'):
-            val = str(int(value) * 0.12)
-        elif val.endswith('em'):
-            val = str(value * 10 + 8)
-        elif val.endswith('pt'):
-            val = str(int(value + 6))
-        else:
-            val = value
-    return val
+# Paths with at least these many co-ordinates are scaled using NumPy
+numpy_threshold = 64
 
 
-def msclr(color):
-    r, g, b, a = rgba(color)
-    return '%02x%02x%02x' % (255*r, 255*g, 255*b)
+# EMU in a pixel at 96 dpi
+emu_per_pixel = 9525
 
-def css_style(style):
-    e = {}
-    attrs = [x for x in style.split(";") if x != '']
+svgns = 'http://www.w3.org/2000/svg'
 
-    for attr in attrs:
-        keys, values = attr.split(':')
-        key, value = keys.split(), values.split()
-        e.update(dict(zip(key, value)))
-    return e
+re_ns = re.compile(r'({.*?})?(.*)')
 
+def msclr(color):
+    return csscolor.resolve(color)[0]
+
+
+def sppr(tag, style, compact=False):
+    """
+    Return the fill and line elements to add to the p:spPr of a shape drawn
+    for a tag with a style dict. These depend only on the tag and the fill,
+    stroke, stroke-width and opacity, so they are built once per combination
+    and cached in sppr_cache. Copy them before use. For example:
+
+        for child in sppr('rect', {'fill': 'red'}):
+            shape.spPr.append(copy(child))
+
+    If compact is true, fully opaque colours omit the a:alpha, which is the
+    default, to reduce the XML size.
+    """
+    return sppr_children(sppr_key(tag, style, compact))
+
+
+def sppr_key(tag, style, compact=False):
+    """Return the key of a tag and style dict's sppr(), i.e. what it depends on"""
+    return (tag, style.get('fill'), style.get('stroke'), style.get('stroke-width'),
+            style.get('opacity'), compact)
+
+
+def sppr_children(key):
+    """Return the sppr() for an sppr_key()"""
+    children = sppr_cache.get(key)
+    if children is None:
+        children = sppr_cache[key] = _sppr(*key)
+    return children
+
+sppr_cache = LRUCache(maxsize=1024)
+
+
+def _sppr(tag, fill, stroke, width, opacity, compact):
+    """Build the fill and line elements for sppr()"""
+    def solid(clr):
+        # The colour's own alpha, e.g. from rgba(), combines with the opacity
+        val, alpha = csscolor.resolve(clr)
+        if opacity is not None:
+            alpha *= float(opacity)
+        alpha = '%d' % int(alpha * 100000)
+        if compact and alpha == '100000':
+            return a.solidFill(a.srgbClr(val=val))
+        return a.solidFill(a.srgbClr(a.alpha(val=alpha), val=val))
+
+    children = []
+    if fill is not None:
+        children.append(a.noFill() if fill == 'none' else solid(fill))
+    elif tag != 'line':
+        children.append(a.solidFill(color(srgbClr='000000')))
+
+    if stroke is not None and width is not None:
+        children.append(a.ln(solid(stroke), w=str(max(0, int(length(width) * 12700)))))
+    elif stroke is not None:
+        children.append(a.ln(a.noFill() if stroke == 'none' else solid(stroke)))
+    elif fill is None:
+        children.append(a.ln(a.solidFill(color(srgbClr='000000'))))
+    return tuple(children)
 
-def tag_attrs(keys, values, e):
-    parent = e.getparent()
-    attrs_dict = dict(zip(keys, values))
-    if 'style' in keys:
-        del attrs_dict['style']
-        style_dict = css_style(e.get('style'))
-        attrs_dict.update(style_dict)
-    if parent.tag == 'g':
-        g_keys = parent.keys()
-        values = parent.values()
-        g_dict = dict(zip(g_keys, values))
-        attrs_dict.update(g_dict)
-        if 'style' in g_keys:
-            del g_dict['style']
-            g_attrs_dict = css_style(parent.get('style'))
-            attrs_dict.update(g_attrs_dict)
-    return attrs_dict
-
-def translate(e):
-    gtag = e.xpath('ancestor::*/@transform')
-    atag = e.get('transform')
-    if atag is not None and atag.startswith('translate'):
-        xy = re.findall('\d*\.?\d+', atag)
-        xy2 = re.findall('\d*\.?\d+', gtag[0] if len(gtag) >= 1 else '0,0')
-        x, y = str(float(xy[0]) + float(xy2[0])), str(float(xy[1]) + float(xy2[1]))
-    elif gtag:
-        xy = re.findall('\d*\.?\d+', gtag[-1])
-        xy2 = re.findall('\d*\.?\d+', gtag[0] if len(gtag) > 1 else '0,0')
-        x, y = str(float(xy[0]) + float(xy2[0])), str(float(xy[1]) + float(xy2[1]))
-    else:
-        x, y = 0, 0
-    return x, y
+def css_style(style):
+    """
+    Return a dict of declarations in a CSS style string. For example:
+
+        css_style('fill: red; stroke: rgb(0, 0, 0)')
+    """
+    e = _css_styles.get(style)
+    if e is None:
+        e = {}
+        for attr in style.split(';'):
+            key, colon, value = attr.partition(':')
+            key, value = key.strip(), value.replace('!important', '').strip()
+            if key and value:
+                e[key] = value
+        _css_styles[style] = e
+    return e
 
+_css_styles = LRUCache(maxsize=4096)
+
+# Presentation attributes that svg2pptx uses. These cascade from ancestors
+presentation = set((
+    'fill', 'fill-opacity', 'stroke', 'stroke-opacity', 'stroke-width',
+    'opacity', 'font-family', 'font-size', 'font-style', 'font-weight',
+    'text-anchor', 'dominant-baseline', 'visibility', 'display',
+))
+
+re_css_comment = re.compile(r'/\*.*?\*/', re.DOTALL)
+re_css_rule = re.compile(r'([^{}]+){([^{}]*)}')
+re_selector = re.compile(r'^([a-zA-Z][\w\-]*|\*)?((?:[\.#][\w\-]+)*)$')
+
+
+class StyleSheet(object):
+    """
+    CSS rules from SVG <style> elements, and the style cascade.
+
+    Only type, class and id selectors are supported, e.g. ``rect``, ``.bar``,
+    ``rect.bar.highlight`` and ``#total``. Rules with other selectors are
+    ignored.
+    """
+    def __init__(self):
+        self.rules = []
+        # Tags with rules that have no class or id. None means any tag
+        self.tags = set()
+        self.matches = {}
+
+    def parse(self, css):
+        """Add the rules in a CSS string"""
+        for selectors, body in re_css_rule.findall(re_css_comment.sub('', css)):
+            for selector in selectors.split(','):
+                match = re_selector.match(selector.strip())
+                if not match or not selector.strip():
+                    continue
+                declarations = css_style(body)
+                tag, rest = match.groups()
+                tag = None if tag == '*' else tag
+                ids = re.findall(r'#([\w\-]+)', rest)
+                classes = frozenset(re.findall(r'\.([\w\-]+)', rest))
+                specificity = (len(ids), len(classes), 1 if tag else 0)
+                self.rules.append((specificity, len(self.rules), tag,
+                                   classes, ids[0] if ids else None, declarations))
+                if not ids and not classes:
+                    self.tags.add(tag)
+        self.rules.sort()
+        self.matches.clear()
+
+    def match(self, tag, cls, id):
+        """Return the declarations that apply to a tag with a class and id"""
+        key = (tag, cls, id)
+        result = self.matches.get(key)
+        if result is None:
+            classes = set(cls.split()) if cls else set()
+            result = {}
+            for specificity, order, t, c, i, declarations in self.rules:
+                if (t is None or t == tag) and c <= classes and (i is None or i == id):
+                    result.update(declarations)
+            self.matches[key] = result
+        return result
+
+    def cascade(self, parent, e, tag):
+        """
+        Return the style dict of element e, given its parent's style dict.
+
+        Presentation attributes are overridden by matching CSS rules, which
+        are overridden by the style attribute. Anything not specified, except
+        display, is inherited from the parent. Opacity multiplies with the
+        parent's, and font-size is resolved to pixels relative to the
+        parent's. If nothing is specified, the parent's dict itself is
+        returned, not a copy.
+        """
+        declared = {}
+        cls = id = style = None
+        for key, value in e.items():
+            if key in presentation:
+                declared[key] = value
+            elif key == 'style':
+                style = value
+            elif key == 'class':
+                cls = value
+            elif key == 'id':
+                id = value
+        if self.rules and (cls or id or tag in self.tags or None in self.tags):
+            declared.update(self.match(tag, cls, id))
+        if style:
+            declared.update(css_style(style))
+        if not declared:
+            return parent
+        style = dict(parent)
+        # display is not inherited. (If nothing is declared, the parent's
+        # display is kept, but a parent with display: none is not drawn)
+        style.pop('display', None)
+        style.update(declared)
+        if 'opacity' in declared and 'opacity' in parent:
+            try:
+                style['opacity'] = repr(float(parent['opacity']) * float(declared['opacity']))
+            except ValueError:
+                pass
+        if 'font-size' in declared:
+            inherited = length(parent.get('font-size'), default=16.0)
+            style['font-size'] = repr(length(declared['font-size'], inherited, inherited,
+                                             default=inherited))
+        return style
+
+
+re_transform = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+re_number = re.compile(r'[\+\-]?(?:\d+\.?\d*|\.\d+)(?:[eE][\+\-]?\d+)?')
+
+# Affine matrices are (a, b, c, d, e, f) tuples, as in SVG's matrix(...)
+identity = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+def multiply(m, n):
+    """Return the matrix that applies n first, then m"""
+    a, b, c, d, e, f = m
+    A, B, C, D, E, F = n
+    return (a * A + c * B, b * A + d * B,
+            a * C + c * D, b * C + d * D,
+            a * E + c * F + e, b * E + d * F + f)
+
+def parse_transform(transform):
+    """
+    Return the matrix for an SVG transform attribute. For example:
+
+        parse_transform('translate(10,20) rotate(45)')
+    """
+    m = identity
+    for name, args in re_transform.findall(transform):
+        v = [float(x) for x in re_number.findall(args)] or [0.0]
+        if name == 'matrix' and len(v) == 6:
+            n = tuple(v)
+        elif name == 'translate':
+            n = (1.0, 0.0, 0.0, 1.0, v[0], v[1] if len(v) > 1 else 0.0)
+        elif name == 'scale':
+            n = (v[0], 0.0, 0.0, v[1] if len(v) > 1 else v[0], 0.0, 0.0)
+        elif name == 'rotate':
+            cos, sin = math.cos(math.radians(v[0])), math.sin(math.radians(v[0]))
+            n = (cos, sin, -sin, cos, 0.0, 0.0)
+            if len(v) == 3:
+                cx, cy = v[1], v[2]
+                n = (cos, sin, -sin, cos,
+                     cx - cos * cx + sin * cy, cy - sin * cx - cos * cy)
+        elif name == 'skewX':
+            n = (1.0, 0.0, math.tan(math.radians(v[0])), 1.0, 0.0, 0.0)
+        elif name == 'skewY':
+            n = (1.0, math.tan(math.radians(v[0])), 0.0, 1.0, 0.0, 0.0)
+        else:
+            continue
+        m = multiply(m, n)
+    return m
+
+
+# Pixels per unit of an SVG length, at 96 dpi. em and ex depend on the font
+units = {'': 1.0, 'px': 1.0, 'pt': 4 / 3.0, 'pc': 16.0, 'in': 96.0, 'cm': 96 / 2.54,
+         'mm': 96 / 25.4}
+re_length = re.compile(r'\s*([\+\-]?(?:\d+\.?\d*|\.\d+)(?:[eE][\+\-]?\d+)?)\s*([a-zA-Z%]*)')
+
+def length(value, percent=100.0, font_size=16.0, default=0.0):
+    """
+    Return an SVG length in pixels, e.g. '-5' is -5.0 and '9pt' is 12.0. em
+    and ex are relative to font_size, and % to percent. Returns default if
+    value is not a length.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    match = re_length.match(value or '')
+    if match is None:
+        return default
+    number, unit = float(match.group(1)), match.group(2).lower()
+    if unit in units:
+        return number * units[unit]
+    if unit == '%':
+        return number * percent / 100
+    if unit == 'em':
+        return number * font_size
+    if unit == 'ex':
+        return number * font_size / 2
+    return default
+
+
+def viewport(symbol, width, height):
+    """
+    Return the matrix that maps a <symbol>'s viewBox to a width x height
+    viewport, following its preserveAspectRatio
+    """
+    box = [float(v) for v in re_number.findall(symbol.get('viewBox', ''))]
+    width, height = length(width), length(height)
+    if len(box) != 4 or not box[2] or not box[3] or not width or not height:
+        return identity
+    sx, sy = width / box[2], height / box[3]
+    ratio = (symbol.get('preserveAspectRatio') or 'xMidYMid meet').split()
+    if ratio[0] == 'none':
+        return (sx, 0.0, 0.0, sy, -box[0] * sx, -box[1] * sy)
+    sx = sy = max(sx, sy) if ratio[-1] == 'slice' else min(sx, sy)
+    align = {'Min': 0.0, 'Mid': 0.5, 'Max': 1.0}
+    dx = (width - box[2] * sx) * align.get(ratio[0][1:4], 0.5)
+    dy = (height - box[3] * sy) * align.get(ratio[0][5:8], 0.5)
+    return (sx, 0.0, 0.0, sy, dx - box[0] * sx, dy - box[1] * sy)
+
+
+def _xfrm(shape, elements=False):
+    """
+    Return the (x, y, w, h) of a shape (p:sp, p:grpSp, p:graphicFrame), as
+    strings. If elements is true, return its a:off and a:ext elements.
+    """
+    xfrm = shape.xpath('p:spPr/a:xfrm|p:grpSpPr/a:xfrm|p:xfrm', namespaces=nsmap)[0]
+    off, ext = xfrm.find('a:off', namespaces=nsmap), xfrm.find('a:ext', namespaces=nsmap)
+    if elements:
+        return off, ext
+    return off.get('x'), off.get('y'), ext.get('cx'), ext.get('cy')
+
+re_trailing_number = re.compile(r'\d+$')
+
+
+def renumber(shape, ids):
+    """Give a shape and its children new ids from ids, and rename them to match"""
+    for el in shape.iter('{%s}cNvPr' % nsmap['p']):
+        id = ids()
+        el.set('id', str(id))
+        el.set('name', re_trailing_number.sub(str(id), el.get('name', '')))
+    return shape
+
+
+def preset_shape(geom, x, y, w, h, rotation=0, flip=False, ids=None):
+    """
+    Return a preset shape (e.g. 'ellipse') with the slide box (x, y, w, h),
+    rotated clockwise by rotation degrees, and flipped vertically if flip
+    """
+    shp = shape(geom, x, y, w, h, ids=ids)
+    if rotation:
+        rot = int(round(rotation * 60000)) % 21600000
+        shp.find('.//a:xfrm', namespaces=nsmap).set('rot', str(rot))
+    if flip:
+        shp.find('.//a:xfrm', namespaces=nsmap).set('flipV', '1')
+    return shp
+
+
+def freeform_shape(x, y, w, h, paths, filled=True, ids=None):
+    """
+    Return a custom shape with the slide box (x, y, w, h) and a path for each
+    (commands, points) in paths. Points are relative to (x, y). See
+    pypptx.path. If filled is false, the paths are not filled (e.g. lines).
+    """
+    pathlst = a.pathLst()
+    for commands, points in paths:
+        subpath = path(commands, points, max(w, 1), max(h, 1))
+        if not filled:
+            subpath.set('fill', 'none')
+        pathlst.append(subpath)
+    shp = cust_shape(x, y, w, h, ids=ids)
+    shp.find('.//a:custGeom', namespaces=nsmap).append(pathlst)
+    return shp
+
+
+def text_shape(x, y, w, h, rotation, text, size, bold, rgb, align, anchor, typeface=None,
+               ids=None):
+    """
+    Return a text box with the slide box (x, y, w, h), rotated clockwise by
+    rotation degrees. size is in 1/100 of a point, bold is '1' or '0', rgb is
+    the hex colour, align is 'l', 'ctr' or 'r' and anchor is 't' or 'ctr'.
+    typeface is the font, or None for the theme's.
+    """
+    shp = preset_shape('rect', x, y, w, h, rotation, ids=ids)
+    rpr = a.rPr(a.solidFill(color(srgbClr=rgb)), lang='en-US', sz=str(size), b=bold,
+                dirty='0', smtClean='0')
+    if typeface:
+        rpr.append(a.latin(typeface=typeface))
+    shp.append(p.txBody(
+        a.bodyPr(anchor=anchor, wrap='none', lIns='0', tIns='0', rIns='0', bIns='0'),
+        a.p(a.pPr(algn=align), a.r(rpr, a.t(text)))))
+    return shp
+
+# Containers whose children are not drawn, except via <use>
+nonrendered = set(tag for name in ('defs', 'symbol', 'clipPath', 'mask', 'marker', 'pattern',
+                                   'linearGradient', 'radialGradient', 'filter')
+                  for tag in (name, name.lower()))
+
+re_url = re.compile(r'url\(\s*[\'"]?#([^\'")\s]+)')
+
+
+def _paints(color, opacity):
+    """Return True if a fill or stroke colour, with an opacity, is visible"""
+    if color == 'none':
+        return False
+    try:
+        if opacity is not None and float(opacity) <= 0:
+            return False
+        # #rgb and #rrggbb, the commonest colours, are opaque
+        return color[:1] == '#' and len(color) in (4, 7) or csscolor.resolve(color)[1] > 0
+    except ValueError:
+        return True
+
+
+def invisible(tag, style):
+    """
+    Return True if an element with a style draws nothing, i.e. it is hidden,
+    fully transparent, or has neither a fill nor a stroke
+    """
+    if style.get('visibility') in ('hidden', 'collapse'):
+        return True
+    try:
+        if float(style.get('opacity', 1)) <= 0:
+            return True
+    except ValueError:
+        pass
+    fill, stroke = style.get('fill'), style.get('stroke')
+    # Without a fill or stroke, lines are black. Without a fill, shapes are
+    # filled black
+    if tag == 'line':
+        if fill is None and stroke is None:
+            return False
+    elif _paints('black' if fill is None else fill, style.get('fill-opacity')):
+        return False
+    if tag != 'text' and stroke is not None and _paints(stroke, style.get('stroke-opacity')):
+        return length(style.get('stroke-width', '1')) <= 0
+    return True
+
+
+def _flushed(handler):
+    """Wrap a handler to draw the pending merged shape before it"""
+    def wrapped(draw, e):
+        draw._flush()
+        return handler(draw, e)
+    return wrapped
+
+
+class Profile(object):
+    """
+    Records where svg2mso spends its time. For example:
+
+        profile = Profile()
+        svg2mso(slide, svg, profile=profile)
+        print profile.report()
+
+    .tags and .phases map each tag drawn, and each phase, to a [count, total
+    time, max time] list. Phases are:
+
+    - transform: parsing transform attributes
+    - style: resolving styles, and parsing <style> sheets (stylesheet)
+    - geometry: creating shapes in handlers
+    - append: adding fill and line properties, and adding shapes to the slide
+
+    .slowest has (time, sourceline, tag) for the slowest elements drawn, up to
+    the number given. Override .record() to collect stats differently.
+    """
+    timer = time.time
+
+    def __init__(self, slowest=10):
+        self.tags, self.phases = {}, {}
+        self.slowest, self.limit = [], slowest
+
+    def record(self, stats, key, duration):
+        """Add a call with a duration to stats[key]"""
+        stat = stats.get(key)
+        if stat is None:
+            stats[key] = [1, duration, duration]
+        else:
+            stat[0] += 1
+            stat[1] += duration
+            if duration > stat[2]:
+                stat[2] = duration
+
+    def phase(self, name, duration):
+        self.record(self.phases, name, duration)
+
+    def element(self, tag, e, duration):
+        self.record(self.tags, tag, duration)
+        if len(self.slowest) < self.limit:
+            heapq.heappush(self.slowest, (duration, e.sourceline, tag))
+        elif self.slowest and duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, e.sourceline, tag))
+
+    def stats(self):
+        """Return the stats as a dict that can be saved as JSON"""
+        table = lambda stats: dict((key, {'count': count, 'time': total, 'max': most})
+                                   for key, (count, total, most) in stats.items())
+        return {'tags': table(self.tags), 'phases': table(self.phases),
+                'slowest': [{'time': duration, 'line': line, 'tag': tag}
+                            for duration, line, tag in sorted(self.slowest, reverse=True)]}
+
+    def report(self):
+        """Return the stats as a printable table"""
+        lines = ['%-16s %8s %10s %10s' % ('tag / phase', 'count', 'total ms', 'max ms')]
+        for stats in (self.tags, self.phases):
+            for key, (count, total, most) in sorted(stats.items(), key=lambda v: -v[1][1]):
+                lines.append('%-16s %8d %10.2f %10.3f' % (key, count, total * 1000, most * 1000))
+        lines.append('slowest elements:')
+        for duration, line, tag in sorted(self.slowest, reverse=True):
+            lines.append('  line %-10s %-10s %8.3f ms' % (line, tag, duration * 1000))
+        return '\n'.join(lines)
 
 
 class Draw(object):
-    def __init__(self, slide, width, height):
+    # Convert each element that <use> refers to once per style, and copy its
+    # shapes. If false, each <use> is converted afresh
+    copies = True
+
+    def __init__(self, slide, width, height, size=None, ids=None, compact=False, merge=0,
+                 simplify=0, profile=None, groups=False, cull=True, fit=True):
+        # slide may be a python-pptx slide, an element (e.g. a p:spTree) or a
+        # pypptx.SlideWriter to append shapes to. size is the slide's (width,
+        # height) in EMU. ids is the slide's IdAllocator. It defaults to the
+        # SlideWriter's, or to one that starts after the largest id on the slide
         self.slide = slide
-        self.shapes = slide._element.find('.//p:spTree', namespaces=nsmap)
-        # TODO: Replace 9999... with slide width and height
-        self.x = lambda x: int(float(x) * 9999999 / width)
-        self.y = lambda y: int(float(y) * 7777777 / height)
-
+        self.shapes = shape_tree(slide)
+        if ids is None:
+            ids = IdAllocator.of(self.shapes)
+        self.ids = ids
+        # Map SVG co-ordinates to EMU. xs() and ys() scale a whole sequence
+        # at once, with the same rounding as x() and y()
+        cx, cy = size or slide_size(slide)
+        self.width, self.height = width, height
+        # The (width, height) of the viewport in SVG units, for % lengths
+        self.viewport = (float(width), float(height))
+        self.x = lambda x: int(float(x) * cx / width)
+        self.y = lambda y: int(float(y) * cy / height)
+        if numpy is not None:
+            self.xs = lambda xs: (numpy.asarray(xs, dtype=float) * cx / width).astype(numpy.int64)
+            self.ys = lambda ys: (numpy.asarray(ys, dtype=float) * cy / height).astype(numpy.int64)
+        else:
+            self.xs = lambda xs: [int(float(x) * cx / width) for x in xs]
+            self.ys = lambda ys: [int(float(y) * cy / height) for y in ys]
+        # Current transformation matrix and style dict of the element being
+        # drawn. svg2mso sets these before calling each handler
+        self.ctm = identity
+        self.style = {}
+        self.names = {}     # Caches the tag without its namespace, for each tag
+        # Omit default values from shape properties. See sppr()
+        self.compact = compact
+        # Merge up to this many adjacent, identically styled shapes into one.
+        # merged has the outlines of the shape being merged. See _outline()
+        self.merge = merge
+        self.merged, self.merged_key, self.merged_first = [], None, None
+        # Drop path points within this many EMU of the simplified path.
+        # vertices counts path points before and after simplification
+        self.simplify = simplify
+        self.vertices = [0, 0]
+        # Profile to record time spent in, or None
+        self.profile = profile
+        # The document's style sheet, its root element (unless streamed) for
+        # finding <use> references, elements with ids found in <defs> when
+        # streaming, and converted <use> references. See use()
+        self.sheet = StyleSheet()
+        self.root, self.defs, self.fragments, self.using = None, {}, {}, set()
+        # Draw <use> references as groups
+        self.groups = groups
+        # Skip elements that draw nothing. clip is the (x1, y1, x2, y2) slide
+        # area that shapes must overlap to be drawn, or None to draw them all.
+        # culled counts the elements (or subtrees) skipped, by reason
+        self.cull = cull
+        self.clip = (0, 0, cx, cy) if cull else None
+        self.culled = {'hidden': 0, 'empty': 0, 'offcanvas': 0}
+        # Fit the document's viewBox to width x height
+        self.fit = fit
+
+    def _point(self, x, y):
+        """Return the slide position of the SVG point (x, y)"""
+        a, b, c, d, e, f = self.ctm
+        return self.x(a * x + c * y + e), self.y(b * x + d * y + f)
+
+    def _length(self, value, axis=0):
+        """
+        Return an attribute's length in SVG units. % is relative to the
+        viewport's width if axis is 0, height if 1, or diagonal if 2. em is
+        relative to the element's font-size
+        """
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            width, height = self.viewport
+            percent = (width, height, math.hypot(width, height) / math.sqrt(2))[axis]
+            return length(value, percent, length(self.style.get('font-size'), default=16.0))
+
+    def _bounds(self, coords):
+        """
+        Return (x, y, w, h, points) for a flat list of SVG x, y coordinates.
+        (x, y, w, h) is their bounding box on the slide. points has their
+        slide positions relative to (x, y). Uses NumPy for long lists.
+        """
+        if not len(coords):
+            return 0, 0, 0, 0, []
+        a, b, c, d, e, f = self.ctm
+        if numpy is not None and len(coords) >= numpy_threshold:
+            coords = numpy.asarray(coords, dtype=float)
+            xs, ys = coords[0::2], coords[1::2]
+            xs, ys = self.xs(a * xs + c * ys + e), self.ys(b * xs + d * ys + f)
+            x, y = xs.min(), ys.min()
+            points = numpy.empty(len(coords), dtype=numpy.int64)
+            points[0::2], points[1::2] = xs - x, ys - y
+            return int(x), int(y), int(xs.max() - x), int(ys.max() - y), points.tolist()
+        X, Y = self.x, self.y
+        xs, ys = coords[0::2], coords[1::2]
+        xs, ys = ([X(a * px + c * py + e) for px, py in zip(xs, ys)],
+                  [Y(b * px + d * py + f) for px, py in zip(xs, ys)])
+        x, y = min(xs), min(ys)
+        points = [0] * len(coords)
+        points[0::2] = [px - x for px in xs]
+        points[1::2] = [py - y for py in ys]
+        return x, y, max(xs) - x, max(ys) - y, points
+
+    def _path(self, e, tag='path'):
+        """
+        Return (commands, x, y, w, h, points) for a path, polygon or polyline
+        element. See _bounds. Runs of lines are simplified to self.simplify
+        EMU, if set.
+        """
+        if tag == 'path':
+            d = e.get('d', '')
+            commands, coords = svgpath.parse(d) if 'nan' not in d else ('', [])
+        else:
+            coords = [float(v) for v in re_number.findall(e.get('points', ''))]
+            del coords[len(coords) & ~1:]
+            commands = 'M' + 'L' * (len(coords) / 2 - 1) if coords else ''
+            if tag == 'polygon' and coords:
+                commands += 'Z'
+        x, y, w, h, points = self._bounds(coords)
+        if self.simplify and 'LL' in commands:
+            commands, points = svgpath.simplify(commands, points, self.simplify)
+        self.vertices[0] += len(coords) / 2
+        self.vertices[1] += len(points) / 2
+        return commands, x, y, w, h, points
+
+    def _box(self, x, y, w, h):
+        """
+        Return the slide (x, y, w, h, rotation) of the SVG box (x, y, w, h).
+        Rotation is in degrees. Skew is approximated by scale and rotation.
+        """
+        a, b, c, d, e, f = self.ctm
+        if b == 0 and c == 0:
+            x, w = a * x + e, a * w
+            y, h = d * y + f, d * h
+            if w < 0:
+                x, w = x + w, -w
+            if h < 0:
+                y, h = y + h, -h
+            return self.x(x), self.y(y), self.x(w), self.y(h), 0
+        cx, cy = x + w / 2.0, y + h / 2.0
+        cx, cy = a * cx + c * cy + e, b * cx + d * cy + f
+        w, h = w * math.hypot(a, b), h * math.hypot(c, d)
+        return (self.x(cx - w / 2), self.y(cy - h / 2), self.x(w), self.y(h),
+                math.degrees(math.atan2(b, a)))
+
+    # Handlers create shapes with these methods, and add them to the slide
+    # with _add() or _style(). Subclasses may override them to record shapes
+    # in another form. See shapeir.Record
+
+    def _new_preset(self, geom, x, y, w, h, rotation=0, flip=False):
+        """Return a new preset shape. See preset_shape"""
+        return preset_shape(geom, x, y, w, h, rotation, flip, self.ids)
+
+    def _new_freeform(self, x, y, w, h, paths, filled=True):
+        """Return a new custom shape. See freeform_shape"""
+        return freeform_shape(x, y, w, h, paths, filled, self.ids)
+
+    def _new_text(self, x, y, w, h, rotation, text, size, bold, rgb, align, anchor, typeface):
+        """Return a new text box. See text_shape"""
+        return text_shape(x, y, w, h, rotation, text, size, bold, rgb, align, anchor, typeface,
+                          self.ids)
+
+    def _add(self, shape):
+        """Add a finished shape to the slide"""
+        self.shapes.append(shape)
+
+    def _outside(self, x1, y1, x2, y2):
+        """
+        Return True if the slide box (x1, y1, x2, y2), plus the current
+        stroke, lies entirely outside the clip area
+        """
+        cx1, cy1, cx2, cy2 = self.clip
+        if x2 >= cx1 and x1 <= cx2 and y2 >= cy1 and y1 <= cy2:
+            return False
+        pad = length(self.style.get('stroke-width'), default=1.0) * 12700
+        return x2 + pad < cx1 or x1 - pad > cx2 or y2 + pad < cy1 or y1 - pad > cy2
+
+    def _culled(self, x, y, w, h, rotation=0, empty=False):
+        """
+        Return True, and count it, if culling and a shape is empty, or its
+        slide box (x, y, w, h), rotated by rotation degrees about its centre,
+        lies entirely outside the clip area. Handlers call this with the
+        sizes they have parsed, before creating a shape
+        """
+        if not self.cull:
+            return False
+        if empty:
+            self.culled['empty'] += 1
+            return True
+        if self.clip is None:
+            return False
+        if rotation:
+            # A rotated box lies within the circle around it
+            r = math.hypot(w, h) / 2
+            x, y, w, h = x + w / 2 - r, y + h / 2 - r, 2 * r, 2 * r
+        if self._outside(x, y, x + w, y + h):
+            self.culled['offcanvas'] += 1
+            return True
+        return False
+
+    def _clip(self, value, ctm, clip):
+        """
+        Return the clip area narrowed by a clip-path="url(#id)" attribute, for
+        an element with matrix ctm. Returns clip if the clip path cannot be
+        bounded cheaply, e.g. if it has text or rotated shapes.
+        """
+        match = re_url.match(value)
+        ref = self._ref(match.group(1)) if match else None
+        if ref is None or ref.get('clipPathUnits') == 'objectBoundingBox':
+            return clip
+        boxes, saved = [], self.ctm
+        try:
+            for child in ref.iterchildren(tag=etree.Element):
+                tag = re_ns.match(child.tag).groups()[-1]
+                transform = child.get('transform')
+                self.ctm = multiply(ctm, parse_transform(transform)) if transform else ctm
+                if tag in ('rect', 'circle', 'ellipse'):
+                    if tag == 'rect':
+                        box = (self._length(child.get('x')), self._length(child.get('y'), 1),
+                               self._length(child.get('width')),
+                               self._length(child.get('height'), 1))
+                    else:
+                        rx = (self._length(child.get('r'), 2) if tag == 'circle' else
+                              self._length(child.get('rx')))
+                        ry = (self._length(child.get('r'), 2) if tag == 'circle' else
+                              self._length(child.get('ry'), 1))
+                        box = (self._length(child.get('cx')) - rx,
+                               self._length(child.get('cy'), 1) - ry,
+                               2 * rx, 2 * ry)
+                    x, y, w, h, rotation = self._box(*box)
+                    if rotation:
+                        return clip
+                elif tag in ('path', 'polygon', 'polyline'):
+                    coords = (svgpath.parse(child.get('d', ''))[1] if tag == 'path' else
+                              [float(v) for v in re_number.findall(child.get('points', ''))])
+                    x, y, w, h, points = self._bounds(coords[:len(coords) & ~1])
+                else:
+                    return clip
+                boxes.append((x, y, x + w, y + h))
+        finally:
+            self.ctm = saved
+        if not boxes:
+            return clip
+        return (max(clip[0], min(box[0] for box in boxes)),
+                max(clip[1], min(box[1] for box in boxes)),
+                min(clip[2], max(box[2] for box in boxes)),
+                min(clip[3], max(box[3] for box in boxes)))
+
+    def _outline(self, tag, e):
+        """
+        Return (commands, points, box) for the outline of a circle, ellipse,
+        rect, line, path, polygon or polyline. commands and points are as in
+        pypptx.path, in slide co-ordinates. box is the (x1, y1, x2, y2)
+        bounding box. Returns None if the element cannot be merged, e.g. if it
+        is rotated.
+        """
+        if tag in ('circle', 'ellipse'):
+            rx = self._length(e.get('r'), 2) if tag == 'circle' else self._length(e.get('rx'))
+            ry = self._length(e.get('r'), 2) if tag == 'circle' else self._length(e.get('ry'), 1)
+            cx, cy = self._length(e.get('cx')), self._length(e.get('cy'), 1)
+            x, y, w, h, rotation = self._box(cx - rx, cy - ry, 2 * rx, 2 * ry)
+            if rotation:
+                return None
+            # A full-circle arc from the right of the ellipse
+            return 'MAZ', [x + w, y + h / 2, w / 2, h / 2, 0, 21600000], (x, y, x + w, y + h)
+        elif tag == 'rect':
+            if 'rx' in e.keys() and 'ry' in e.keys():
+                return None
+            x, y, w, h, rotation = self._box(
+                self._length(e.get('x')), self._length(e.get('y'), 1),
+                max(0.0, self._length(e.get('width'))), max(0.0, self._length(e.get('height'), 1)))
+            if rotation:
+                return None
+            return 'MLLLZ', [x, y, x + w, y, x + w, y + h, x, y + h], (x, y, x + w, y + h)
+        elif tag == 'line':
+            x1, y1 = self._point(self._length(e.get('x1')), self._length(e.get('y1'), 1))
+            x2, y2 = self._point(self._length(e.get('x2')), self._length(e.get('y2'), 1))
+            return 'ML', [x1, y1, x2, y2], (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        elif tag in ('path', 'polygon', 'polyline'):
+            commands, x, y, w, h, points = self._path(e, tag)
+            if not commands:
+                return None
+            points[0::2] = [px + x for px in points[0::2]]
+            points[1::2] = [py + y for py in points[1::2]]
+            return commands, points, (x, y, x + w, y + h)
+
+    def _merge(self, function, e, outline):
+        """
+        Add an element's outline to the merged shape, first drawing the merged
+        shape if it has a different style or is full
+        """
+        style = self.style
+        key = (function.__name__, style.get('fill'), style.get('stroke'),
+               style.get('stroke-width'), style.get('opacity'))
+        if key != self.merged_key or len(self.merged) >= self.merge:
+            self._flush()
+            # Keep the first element, to draw it as usual if it is not merged.
+            # Copy it, since streamed elements are cleared once drawn
+            self.merged_key = key
+            self.merged_first = (function, etree.Element(e.tag, e.attrib), self.ctm, style,
+                                 self.clip)
+        self.merged.append(outline)
+
+    def _flush(self):
+        """Draw the merged shape, if any, as one freeform with many paths"""
+        if not self.merged:
+            return
+        merged, self.merged, self.merged_key = self.merged, [], None
+        function, e, ctm, style, clip = self.merged_first
+        if len(merged) == 1:
+            saved = self.ctm, self.style, self.clip
+            self.ctm, self.style, self.clip = ctm, style, clip
+            self._draw(function, e)
+            self.ctm, self.style, self.clip = saved
+            return
+        x = min(box[0] for commands, points, box in merged)
+        y = min(box[1] for commands, points, box in merged)
+        w = max(box[2] for commands, points, box in merged) - x
+        h = max(box[3] for commands, points, box in merged) - y
+        paths = []
+        for commands, points, box in merged:
+            if commands == 'MAZ':
+                points = [points[0] - x, points[1] - y] + points[2:]
+            else:
+                points = list(points)
+                points[0::2] = [px - x for px in points[0::2]]
+                points[1::2] = [py - y for py in points[1::2]]
+            paths.append((commands, points))
+        shp = self._new_freeform(x, y, w, h, paths, filled=function.__name__ != 'line')
+        self._style(shp, function.__name__, style)
+
+    def _style(self, shape, tag, style):
+        """Add the fill and line for a style to a shape, and draw it"""
+        spPr = shape.spPr
+        for child in sppr(tag, style, self.compact):
+            spPr.append(copy(child))
+        # Append after styling, so that streamed shapes are complete
+        self._add(shape)
+        return shape
+
+    def _draw(self, function, e):
+        """
+        Draw an element with a handler, and style it. Handlers return None
+        for shapes that are culled
+        """
+        if self.profile is not None:
+            timer = self.profile.timer
+            start = timer()
+            shape = function(self, e)
+            drawn = timer()
+            if shape is None:
+                return None
+            self._style(shape, function.__name__, self.style)
+            self.profile.phase('geometry', drawn - start)
+            self.profile.phase('append', timer() - drawn)
+            return shape
+        shape = function(self, e)
+        if shape is None:
+            return None
+        # TODO: tooltip
+        # child = [x.tag for x in e.getchildren()]
+        # title_text = [x.text for x in e.getchildren()]
+        # if 'title' in child:
+        #     shape.find('.//a:cNvPr', namespaces=nsmap).append(
+        #         a.hlinkClick, action="ppaction://hlinksldjump", tooltip=title_text)
+        #     print title_text
+        return self._style(shape, function.__name__, self.style)
 
     def _shape_attrs(function):
         def wrapped(self, e):
-            shape = function(self, e)
-            # TODO: tooltip
-            # child = [x.tag for x in e.getchildren()]
-            # title_text = [x.text for x in e.getchildren()]
-            # if 'title' in child:
-            #     shape.find('.//a:cNvPr', namespaces=nsmap).append(
-            #         a.hlinkClick, action="ppaction://hlinksldjump", tooltip=title_text)
-            #     print title_text
             tag = function.__name__
-            keys = e.keys()
-            values = e.values()
-
-            def styles(keys):
-                def clr_grad(color):
-                    if color.startswith('rgba('):
-                        r, g, b, a = rgba(color)
-                        return  '%d' % int(a*100000)
-                    elif 'opacity' in keys:
-                        return '%d' % int(float(e.get('opacity')) * 100000)
-                    else:
-                        return '%d' % 100000
-
-
-                # TODO: Optimize
-                if 'fill' in keys:
-                    if e.get('fill') == 'none':
-                        shape.spPr.append(a.noFill())
-                    else:
-                        shape.spPr.append(a.solidFill(a.srgbClr(a.alpha(val=str(clr_grad(e.get('fill')))),
-                            val=str(msclr(e.get('fill'))))))
-                elif not 'fill' in keys:
-                    if tag not in ['line']:
-                        shape.spPr.append(a.solidFill(color(srgbClr='000000')))
-
-                if 'stroke' in keys and 'stroke-width' in keys:
-                    shape.spPr.append(a.ln(a.solidFill(a.srgbClr(a.alpha(val=str(clr_grad(e.get('stroke')))),
-                        val=str(msclr(e.get('stroke'))))),
-                        w=str(int(float(interpret_str(e.get('stroke-width')))*12700))))
-                elif 'stroke' in keys:
-                    if e.get('stroke') == 'none':
-                        shape.spPr.append(a.ln(a.noFill()))
-                    else:
-                        shape.spPr.append(a.ln(a.solidFill(a.srgbClr(a.alpha(val=str(clr_grad(e.get('stroke')))), val=str(msclr(e.get('stroke')))))))
-                elif 'stroke' and 'fill' not in keys:
-                    shape.spPr.append(a.ln(a.solidFill(color(srgbClr='000000'))))
-                elif not 'stroke' and 'fill' in keys:
-                    if tag in ['rect']:
-                        shape.spPr.append(a.ln(a.noFill()))
-                    elif tag in ['circle','ellipse']:
-                        shape.spPr.append(a.ln(a.solidFill(color(srgbClr=msclr(e.get('fill'))))))
-                    elif tag in ['path', 'line']:
-                        shape.spPr.append(a.ln(a.solidFill(color(srgbClr='000000'))))
-                return shape
-
-
-            e = tag_attrs(keys, values, e)
-            keys = e.keys()
-            styles(keys)
-
-            return shape
+            if self.cull and invisible(tag, self.style):
+                self.culled['hidden'] += 1
+                return
+            if self.merge > 1:
+                outline = self._outline(tag, e)
+                if outline is not None:
+                    x1, y1, x2, y2 = outline[2]
+                    if self._culled(x1, y1, x2 - x1, y2 - y1, empty=tag in (
+                            'circle', 'ellipse', 'rect') and (x2 <= x1 or y2 <= y1)):
+                        return
+                    return self._merge(function, e, outline)
+                self._flush()
+            return self._draw(function, e)
+        # Mark the handler as one that merges outlines or flushes them itself
+        wrapped.merges = True
         return wrapped
 
     @_shape_attrs
     def circle(self, e):
-        ax, ay = translate(e)
-        x = float(e.get('cx', 0)) + float(ax)
-        y = float(e.get('cy', 0)) + float(ay)
-        r = float(e.get('r', 0))
-        shp = shape('ellipse', self.x(x - r), self.y(y - r),
-                               self.x(2 * r), self.y(2 * r))
-        self.shapes.append(shp)
-        return shp
+        x = self._length(e.get('cx'))
+        y = self._length(e.get('cy'), 1)
+        r = self._length(e.get('r'), 2)
+        x, y, w, h, rotation = self._box(x - r, y - r, 2 * r, 2 * r)
+        if self._culled(x, y, w, h, rotation, empty=r <= 0):
+            return
+        return self._new_preset('ellipse', x, y, w, h, rotation)
 
     @_shape_attrs
     def ellipse(self, e):
-        ax, ay = translate(e)
-        x = float(e.get('cx', 0)) + float(ax)
-        y = float(e.get('cy', 0)) + float(ay)
-        rx = float(e.get('rx', 0))
-        ry = float(e.get('ry', 0))
-        shp = shape('ellipse', self.x(x - rx), self.y(y - ry),
-                               self.x(2 * rx), self.y(2 * ry))
-        self.shapes.append(shp)
-        return shp
+        x = self._length(e.get('cx'))
+        y = self._length(e.get('cy'), 1)
+        rx = self._length(e.get('rx'))
+        ry = self._length(e.get('ry'), 1)
+        x, y, w, h, rotation = self._box(x - rx, y - ry, 2 * rx, 2 * ry)
+        if self._culled(x, y, w, h, rotation, empty=rx <= 0 or ry <= 0):
+            return
+        return self._new_preset('ellipse', x, y, w, h, rotation)
 
     @_shape_attrs
     def rect(self, e):
-        ax, ay = translate(e)
-        x = float(interpret_str(e.get('x', 0))) + float(ax)
-        y = float(interpret_str(e.get('y', 0))) + float(ay)
+        x = self._length(e.get('x'))
+        y = self._length(e.get('y'), 1)
         keys = e.keys()
         shp_name = 'roundRect' if 'rx' in keys and 'ry' in keys else 'rect'
-        shp = shape(shp_name,
-            self.x(x),
-            self.y(y),
-            self.x(interpret_str(e.get('width', 0))),
-            self.y(interpret_str(e.get('height', 0)))
-        )
-        self.shapes.append(shp)
-        return shp
+        # Negative sizes are errors, and disable rendering
+        width = max(0.0, self._length(e.get('width')))
+        height = max(0.0, self._length(e.get('height'), 1))
+        x, y, w, h, rotation = self._box(x, y, width, height)
+        if self._culled(x, y, w, h, rotation, empty=width <= 0 or height <= 0):
+            return
+        return self._new_preset(shp_name, x, y, w, h, rotation)
 
     @_shape_attrs
     def line(self, e):
-        ax, ay = translate(e)
-        x1 = self.x(float(interpret_str(e.get('x1', 0))) + float(ax))
-        y1 = self.y(float(interpret_str(e.get('y1', 0))) + float(ay))
-        x2 = self.x(float(interpret_str(e.get('x2', 0))) + float(ax))
-        y2 = self.y(float(interpret_str(e.get('y2', 0))) + float(ay))
+        x1, y1 = self._point(self._length(e.get('x1')), self._length(e.get('y1'), 1))
+        x2, y2 = self._point(self._length(e.get('x2')), self._length(e.get('y2'), 1))
         ax1 = x1 if x2 > x1 else x2
         ax2 = x2 if x1 < x2 else x1
         ay1 = y1 if y2 > y1 else y2
         ay2 = y2 if y1 < y2 else y1
-        shp = shape('line', ax1, ay1, ax2-ax1, ay2-ay1)
-        self.shapes.append(shp)
-        return shp
+        if self._culled(ax1, ay1, ax2 - ax1, ay2 - ay1):
+            return
+        return self._new_preset('line', ax1, ay1, ax2-ax1, ay2-ay1,
+                                flip=(x2 - x1) * (y2 - y1) < 0)
 
     def text(self, e):
         keys = e.keys()
-        values = e.values()
         txt = e.text
+        style = self.style
         def txt_anchor():
             anchor_dict = {'hanging':'t', 'middle':'ctr', True:'t', False:'ctr', 'left':'ctr'}
-            if 'dominant-baseline' in keys:
-                anchor = anchor_dict[e.get('dominant-baseline')]
+            if 'dominant-baseline' in style:
+                anchor = anchor_dict.get(style['dominant-baseline'], 'ctr')
             elif 'dy' in keys:
-                em = float(re.findall(".\d+", e.get('dy'))[0]) > 0.5
+                em = length(e.get('dy'), font_size=font_size) > 0.5 * font_size
                 anchor = anchor_dict[em]
             # elif 'text-anchor' in keys:
             #     anchor = anchor_dict[e.get('text-anchor')]
@@ -228,170 +969,445 @@ class Draw(object):
             return anchor
 
         def txt_align():
-            if 'text-anchor' in keys:
+            if 'text-anchor' in style:
                 align_dict = {'end':'r', 'middle':'ctr', 'start':'l', 'left':'l'}
-                align = align_dict[e.get('text-anchor')]
+                align = align_dict.get(style['text-anchor'], 'l')
             else:
                 align = 'l'
             return align
 
         if not e.text:
             return
-        ax, ay = translate(e)
-        x = float(interpret_str(e.get('x', 0))) + float(ax)
-        y = float(interpret_str(e.get('y', 0))) + float(ay)
-        shp = shape('rect', self.x(x), self.y(y), self.x(0), self.y(0))
-        if 'transform' in keys:
-            t_key = e.get('transform')
-            rotate = str(int(t_key[(t_key.find('rotate')+7):-1].split()[0])*60000)
-            shp.find('.//a:xfrm', namespaces=nsmap).set('rot', rotate)
-        def text_style(keys, txt):
-
-            bold = '1' if 'font-weight' in keys else '0'
-
-            fill_text_ml = a.solidFill(color(srgbClr=msclr(e.get('fill') if 'fill' in keys else 'black')))
-
-            autofit_ml = a.normAutofit(fontScale="62500", lnSpcReduction="20000")    # Auto fit
-
-            font_size = str(int(float(interpret_str(e.get('font-size')))*100)) if 'font-size' in keys else '1600'
-
-
-            shp.append(p.txBody(a.bodyPr(anchor=txt_anchor(), wrap='none'),
-            a.p(a.pPr(algn=txt_align()), a.r(a.rPr(fill_text_ml, lang='en-US', sz=font_size, b=bold, dirty='0', smtClean='0'),
-                    a.t(txt)))))
-
-            return shp
-
-        e = tag_attrs(keys, values, e)
-        keys = e.keys()
-        text_style(keys, txt)
-
-        self.shapes.append(shp)
+        if self.cull and invisible('text', style):
+            self.culled['hidden'] += 1
+            return
+        self._flush()
+        x, y = self._point(self._length(e.get('x')), self._length(e.get('y'), 1))
+        weight = style.get('font-weight', 'normal')
+        bold = '1' if weight in ('bold', 'bolder') or weight[:1] in ('6', '7', '8', '9') else '0'
+        font_size = length(style.get('font-size'), default=16.0)
+        align, anchor = txt_align(), txt_anchor()
+
+        # Size the box to fit the text, so PowerPoint need not lay it out.
+        # Font sizes are in points. (dx, dy) is the box's centre from (x, y)
+        w, h = fontmetrics.measure(txt, style.get('font-family'), font_size, bold == '1')
+        w, h = int(w * 12700), int(h * 12700)
+        dx = {'l': w / 2, 'ctr': 0, 'r': -w / 2}[align]
+        dy = h / 2 if anchor == 't' else 0
+        # The box rotates about its centre, so rotate the centre about (x, y)
+        rotation = math.atan2(self.ctm[1], self.ctm[0])
+        cos, sin = math.cos(rotation), math.sin(rotation)
+        x, y = int(x + dx * cos - dy * sin - w / 2), int(y + dx * sin + dy * cos - h / 2)
+        rotation = math.degrees(rotation)
+        if self._culled(x, y, w, h, rotation):
+            return
+        # Draw in the typeface that was measured, not the theme's
+        shp = self._new_text(x, y, w, h, rotation, txt, int(round(font_size * 100)), bold,
+                             msclr(style.get('fill', 'black')), align, anchor,
+                             fontmetrics.typeface(style.get('font-family')))
+        self._add(shp)
         return shp
 
-    # def table(self, e):
-    #     thead_th = e.xpath('//table//th')
-    #     tbody_td = e.xpath('//table//td')
-    #     x = e.xpath('//table//tr')
-    #     for y in x:
-    #         for z in y:
-    #             print z.text
-    #     rows = len(thead_th)
-
-    #     # cust_table(x, y, cx, cy)
-    #     shp = cust_table('464016', '1397000', '8188664', '1982034' )
-    #     gridcol = []
-    #     th_list = []
-    #     td_list = []
-
-    #     for th in thead_th:
-    #         gc = a.gridCol(w="744424")
-    #         gridcol.append(gc)
-    #         th_list.append(th.text)
-    #     for td in tbody_td:
-    #         td_list.append(td.text)
-
-    #     texts = th_list+td_list
-    #     text_values = [texts[i:i+rows] for i in range(0, len(texts), rows)]
-
-    #     shp.find('.//a:tbl', namespaces=nsmap).append(a.tblGrid(*gridcol))
-    #     for row in text_values:
-    #         shp.find('.//a:tbl', namespaces=nsmap).append(a.tr(h='841233'))
-    #         for val in row:
-    #             print val
-
-
-    #     self.shapes.append(shp)
-    #     return shp
-
-
     @_shape_attrs
     def path(self, e):
-        pathstr = re_path.findall(e.get('d', '')) if 'nan' not in e.get('d') else []
-        n, length, cmd, relative, shp = 0, len(pathstr), None, False, None
-        x1, y1 = 0, 0
-        ax, ay = translate(e)
-        xy = lambda n: (float(pathstr[n]) + (x1 if relative else 0) + float(ax),
-                        float(pathstr[n + 1]) + (y1 if relative else 0) + float(ay))
-
-        shp = cust_shape(x1, y1, self.x(100000), self.y(100000))
-        path = a.path(w=str(self.x(100000)), h=str(self.y(100000)))
-        shp.find('.//a:custGeom', namespaces=nsmap).append(
-            a.pathLst(path))
-
-        while n < length:
-            if pathstr[n].lower() in 'mzlhvcsqta':
-                cmd = pathstr[n].lower()
-                relative = str.islower(pathstr[n])
-                n += 1
-
-
-            if cmd == 'm':
-                x1, y1 = xy(n)
-                path.append(a.moveTo(a.pt(x=str(self.x(x1)), y=str(self.y(y1)))))
-                n += 2
-
-
-            elif cmd == 'z':
-                path.append(a.close())
-
-            elif cmd == 'l':
-                x1, y1 = xy(n)
-                path.append(a.lnTo(a.pt(x=str(self.x(x1)), y=str(self.y(y1)))))
-                n += 2
-
-
-            elif cmd == 'c':
-                xc1, yc1 = xy(n)
-                xc2, yc2 = xy(n + 2)
-                x1, y1 = xy(n + 4)
-                path.append(a.cubicBezTo(a.pt(x=str(self.x(xc1)), y=str(self.y(yc1))),
-                    a.pt(x=str(self.x(xc2)), y=str(self.y(yc2))),
-                    a.pt(x=str(self.x(x1)), y=str(self.y(y1)))))
-                n += 6
-
-
-            #TODO blockArc:
-            #elif cmd == 'a':
-            #    x1, y1 = xy(n)
-            #    cx, cy = xy(n + 5)
-            #    shp = shape('blockArc', self.x(x1), self.y(y1), self.x(cx), self.y(cy))
-            #    n += 7
-
-            elif cmd == 'a':
-                wR, hR = xy(n)
-                stAng, swAng = xy(n + 5)
-                path.append(a.arcTo(
-                    wR=str(self.x(wR)), hR=str(self.y(hR)),
-                    stAng=str(self.x(stAng)), swAng=str(self.y(swAng))))
-                n += 7
-
-        self.shapes.append(shp)
-        return shp
+        return self._freeform(e, 'path')
 
+    @_shape_attrs
+    def polygon(self, e):
+        return self._freeform(e, 'polygon')
+
+    @_shape_attrs
+    def polyline(self, e):
+        return self._freeform(e, 'polyline')
 
+    def _freeform(self, e, tag):
+        """Return a custom shape for a path, polygon or polyline"""
+        commands, x, y, w, h, points = self._path(e, tag)
+        if self._culled(x, y, w, h, empty=not commands):
+            return
+        return self._new_freeform(x, y, w, h, [(commands, points)])
+
+    def _walk(self, events, ctm, style, root=None, stream=False):
+        """
+        Draw the elements from lxml (event, element) start and end events.
+        ctm and style are the transformation matrix and style of the parent.
+        root is the first element, which is drawn even if it is in a
+        container that is not rendered (e.g. <symbol>). If stream is true,
+        each element is cleared once drawn.
+        """
+        # Keep a stack of transformation matrices, style dicts, tags, whether
+        # the element is hidden (e.g. in <defs>), its clip area, and whether
+        # it is kept for <use> when streaming. Each element is
+        # drawn when it ends (i.e. when its text has been parsed). Its handler
+        # reads its matrix from draw.ctm and its style from draw.style
+        handlers = type(self).dispatch()
+        names, sheet, profile = self.names, self.sheet, self.profile
+        timer = profile.timer if profile is not None else None
+        stack = [(ctm, style, None, False, self.clip, 0)]
+        for event, e in events:
+            if event == 'start':
+                ctm, style, parent, hidden, clip, keep = stack[-1]
+                tag = names.get(e.tag)
+                if tag is None:
+                    tag = names[e.tag] = re_ns.match(e.tag).groups()[-1]
+                if tag in nonrendered and e is not root:
+                    hidden = True
+                transform = e.get('transform')
+                if timer is None:
+                    if transform:
+                        ctm = multiply(ctm, parse_transform(transform))
+                    style = sheet.cascade(style, e, tag)
+                else:
+                    start = timer()
+                    if transform:
+                        ctm = multiply(ctm, parse_transform(transform))
+                        profile.phase('transform', timer() - start)
+                    start = timer()
+                    style = sheet.cascade(style, e, tag)
+                    profile.phase('style', timer() - start)
+                if (self.fit and parent is None and root is None and tag == 'svg' and
+                        e.get('viewBox')):
+                    # Fit the document's viewBox to the slide
+                    ctm = multiply(ctm, viewport(e, str(self.width), str(self.height)))
+                    box = [float(v) for v in re_number.findall(e.get('viewBox'))]
+                    if len(box) == 4 and box[2] > 0 and box[3] > 0:
+                        self.viewport = (box[2], box[3])
+                if self.cull and not hidden:
+                    # Skip subtrees that are not displayed, or clipped away
+                    if style.get('display') == 'none':
+                        hidden = True
+                        self.culled['hidden'] += 1
+                    elif clip is not None and e.get('clip-path'):
+                        clip = self._clip(e.get('clip-path'), ctm, clip)
+                        if clip[0] > clip[2] or clip[1] > clip[3]:
+                            hidden = True
+                            self.culled['offcanvas'] += 1
+                # Keep the outermost hidden elements with ids, when streaming.
+                # 1 means keep a copy of this element, 2 means it is in one
+                if keep:
+                    keep = 2
+                elif stream and hidden and e.get('id'):
+                    keep = 1
+                stack.append((ctm, style, tag, hidden, clip, keep))
+                continue
+
+            ctm, style, tag, hidden, clip, keep = stack.pop()
+            if tag == 'style' and e.text:
+                start = timer() if timer is not None else None
+                sheet.parse(e.text)
+                if timer is not None:
+                    profile.phase('stylesheet', timer() - start)
+            elif hidden:
+                if keep == 1:
+                    # Copy elements that <use> may refer to, since streamed
+                    # elements are cleared. Ids inside them refer to the copy
+                    for el in deepcopy(e).iter(tag=etree.Element):
+                        if el.get('id'):
+                            self.defs[el.get('id')] = el
+            elif e.tag in handlers:
+                self.ctm, self.style, self.clip = ctm, style, clip
+                if timer is None:
+                    handlers[e.tag](self, e)
+                else:
+                    start = timer()
+                    handlers[e.tag](self, e)
+                    profile.element(tag, e, timer() - start)
+
+            if stream and keep != 2:
+                # Free this element and the siblings drawn before it
+                e.clear()
+                while e.getprevious() is not None:
+                    del e.getparent()[0]
+
+    def use(self, e):
+        """Draw a copy of the element that a <use> refers to"""
+        # Draw pending merged shapes first, to keep the order of shapes
+        self._flush()
+        href = e.get('{http://www.w3.org/1999/xlink}href') or e.get('href') or ''
+        ref = self._ref(href[1:]) if href.startswith('#') else None
+        if ref is None or href in self.using:
+            return
+        ctm = multiply(self.ctm, (1.0, 0.0, 0.0, 1.0, self._length(e.get('x')),
+                                     self._length(e.get('y'), 1)))
+        if re_ns.match(ref.tag).groups()[-1] == 'symbol':
+            ctm = multiply(ctm, viewport(ref, e.get('width'), e.get('height')))
+        style = self.style
+
+        a, b, c, d, tx, ty = ctm
+        if b or c or a <= 0 or d <= 0 or not self.copies:
+            # Skewed, rotated or flipped copies are converted afresh
+            for shape in self._fragment(href, ref, ctm, style):
+                self._add(shape)
+            return
 
-def svg2mso(slide, svg, width=940, height=None):
+        # Convert the reference once per style and scale, unmoved. Then move
+        # a copy of the shapes, or group them. (Scaling copies would not
+        # scale them as drawing afresh does, e.g. their text boxes)
+        key = (href, a, d, tuple(sorted(style.items())))
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            shapes = self._fragment(href, ref, (a, 0.0, 0.0, d, 0.0, 0.0), style)
+            boxes = [[int(v) for v in _xfrm(shape)] for shape in shapes]
+            x = min(box[0] for box in boxes) if boxes else 0
+            y = min(box[1] for box in boxes) if boxes else 0
+            w = max(box[0] + box[2] for box in boxes) - x if boxes else 0
+            h = max(box[1] + box[3] for box in boxes) - y if boxes else 0
+            fragment = self.fragments[key] = (shapes, (x, y, w, h))
+        shapes, box = fragment
+        if not shapes:
+            return
+        tx, ty = self.x(tx), self.y(ty)
+        if self.groups:
+            x, y, w, h = box[0] + tx, box[1] + ty, box[2], box[3]
+            if self.clip is not None and self._outside(x, y, x + w, y + h):
+                self.culled['offcanvas'] += 1
+                return
+            grp = group(x, y, w, h, box, ids=self.ids)
+            for shape in shapes:
+                grp.append(self._copy(shape))
+            self._add(grp)
+            return
+        for shape in shapes:
+            x, y, w, h = [int(v) for v in _xfrm(shape)]
+            x, y = x + tx, y + ty
+            if self.clip is not None and self._outside(x, y, x + w, y + h):
+                self.culled['offcanvas'] += 1
+                continue
+            shape = self._copy(shape)
+            off = _xfrm(shape, elements=True)[0]
+            off.set('x', str(x))
+            off.set('y', str(y))
+            self._add(shape)
+
+    def _ref(self, id):
+        """Return the element with an id, or None"""
+        if id not in self.defs and self.root is not None:
+            # Index the document's ids the first time, and only once
+            for el in self.root.iter(tag=etree.Element):
+                if el.get('id'):
+                    self.defs.setdefault(el.get('id'), el)
+            self.root = None
+        return self.defs.get(id)
+
+    def _fragment(self, href, ref, ctm, style):
+        """Return the shapes for an element, drawn with a ctm and style"""
+        self._flush()
+        saved = self.shapes, self.ctm, self.style, self.clip
+        # Copies of the shapes are moved, so do not cull them by position
+        self.shapes, self.clip = [], None
+        self.using.add(href)
+        try:
+            self._walk(etree.iterwalk(ref, events=('start', 'end')), ctm, style, root=ref)
+            self._flush()
+            return self.shapes
+        finally:
+            self.using.discard(href)
+            self.shapes, self.ctm, self.style, self.clip = saved
+
+    def _copy(self, shape):
+        """Return a copy of a shape with new ids"""
+        return renumber(copy(shape), self.ids)
+
+    # Decorator for handlers that return a shape, to fill, outline and draw it
+    styled = staticmethod(_shape_attrs)
+
+    @classmethod
+    def dispatch(cls):
+        """
+        Return a dict mapping tags to handlers, called as handler(draw, e). Each
+        public method of the class (e.g. circle) handles its bare tag (circle)
+        and SVG tag ({http://www.w3.org/2000/svg}circle). The dict is built
+        once per class, and includes handlers added with register().
+        """
+        table = cls.__dict__.get('_dispatch')
+        if table is None:
+            table = {}
+            for base in reversed(cls.__mro__[1:]):
+                if issubclass(base, Draw):
+                    table.update(base.dispatch())
+            for tag, handler in vars(cls).items():
+                if not tag.startswith('_') and isinstance(handler, types.FunctionType):
+                    table[tag] = table['{%s}%s' % (svgns, tag)] = handler
+            table.update(cls.__dict__.get('_registered', {}))
+            cls._dispatch = table
+        return table
+
+    @classmethod
+    def register(cls, tag, handler):
+        """
+        Draw elements with a tag using handler(draw, e). For example:
+
+            def image(draw, e):
+                draw.shapes.append(...)
+            Draw.register('image', image)
+
+        Use Draw.styled(handler) for handlers that return a shape, to give it
+        the element's fill and stroke. Other handlers first draw the pending
+        merged shape, so that their shapes stay above earlier elements. The
+        handler applies to the class and its subclasses, unless they define
+        or register their own, including subclasses that have already drawn.
+        """
+        if not getattr(handler, 'merges', False):
+            handler = _flushed(handler)
+        if '_registered' not in cls.__dict__:
+            cls._registered = {}
+        cls._registered[tag] = cls._registered['{%s}%s' % (svgns, tag)] = handler
+        # Rebuild the tables of the class and its subclasses when next used
+        classes = [cls]
+        while classes:
+            klass = classes.pop()
+            klass._dispatch = None
+            classes.extend(klass.__subclasses__())
+
+
+
+def svg2mso(slide, svg, width=940, height=None, size=None, ids=None, stream=False,
+            compact=False, merge=0, simplify=0, profile=None, groups=False, cache=None,
+            cull=True, fit=True):
+    """
+    Draw an SVG on a slide. svg may be an lxml tree or element, a file, or a
+    string. width and height are the SVG dimensions that map to the slide.
+
+    slide is a python-pptx slide, or an element to append shapes to, such as a
+    p:spTree or a pypptx.SlideWriter. For these, pass the slide's (width,
+    height) in EMU as size.
+
+    ids is the pypptx.IdAllocator for the slide's shape ids. By default, ids
+    start after the largest id on the slide, so converting the same SVG onto
+    the same slide always gives the same output, even from several threads.
+
+    If stream is true, svg must be a file name or file. It is parsed
+    incrementally, and each element is cleared once drawn, so only the
+    ancestors of the current element are held in memory. Use this for very
+    large SVGs, with a SlideWriter as the slide.
+
+    If compact is true, shape properties omit default values, such as fully
+    opaque alpha, to reduce the XML size.
+
+    If merge is more than 1, up to merge adjacent circles, ellipses, rects,
+    lines or paths with the same style are drawn as one freeform shape with
+    many paths. This makes dense charts (e.g. scatterplots) much faster to
+    open in PowerPoint. Rotated shapes and rounded rects are not merged.
+
+    If simplify is set, runs of lines in paths are simplified, dropping
+    points within simplify EMU of the path (see svgpath.simplify). 9525 EMU is
+    1 pixel at 96 dpi.
+
+    profile is an optional Profile that records the time taken by each tag and
+    phase. This costs little, and nothing if profile is None.
+
+    Elements in <defs>, <symbol> and other containers that are not rendered
+    are drawn only via <use>. Each referenced element is converted once per
+    style, then copied for each <use>. If groups is true, each copy is a
+    group shape. When streaming, <use> can only refer to earlier elements in
+    <defs> or <symbol>.
+
+    If cull is true (the default), elements that draw nothing are skipped:
+    those with display="none", visibility="hidden", zero opacity, no fill or
+    stroke, or zero size, and those whose bounding box lies outside the slide
+    or their clip-path.
+
+    If fit is true (the default), the document's viewBox, if any, is scaled
+    to fit width x height, following its preserveAspectRatio. If false, SVG
+    user units map to width x height directly, as before viewBoxes were
+    fitted.
+
+    cache is an optional slidecache.SlideCache. The shapes drawn are saved in
+    it, keyed by the SVG's content and these options. If the same SVG is
+    drawn again, its saved shapes are copied onto the slide with new ids.
+    With a cache, streamed shapes are held in memory until the SVG is drawn.
+
+    Returns the Draw object. Its .vertices has the number of path points
+    before and after simplification, and .culled counts the elements skipped
+    by reason. Returns None if the shapes were copied from the cache.
+    """
+    width, height = _dimensions(width, height)
+    if cache is not None:
+        return _cached(cache, slide, svg, width, height, size, ids, stream,
+                       compact, merge, simplify, profile, groups, cull, fit)
+    draw = Draw(slide, width, height, size, ids, compact, merge, simplify, profile, groups, cull,
+                fit)
+    return _run(draw, svg, stream)
+
+
+def _dimensions(width, height):
+    """Return the SVG (width, height), defaulting either to a 4:3 ratio"""
     if width is not None and height is None:
         height = width * 3 / 4
     elif width is None and height is not None:
         width = height * 4 / 3
+    return width, height
 
-    # Convert tree into an lxml etree if it's not one
-    if not hasattr(svg, 'iter'):
-        svg = etree.parse(svg) if hasattr(svg, 'read') else etree.fromstring(svg)
 
-    # Take all the tags and draw it
-    draw = Draw(slide, width, height)
-    valid_tags = set(tag for tag in dir(draw) if not tag.startswith('_'))
-    for e in svg.iter(tag=etree.Element):
-        match = re_ns.match(e.tag)
-        if not match:
-            continue
+def _run(draw, svg, stream=False):
+    """Draw an SVG with a Draw object, and return it. See svg2mso"""
+    if stream:
+        events = etree.iterparse(svg, events=('start', 'end'), huge_tree=True)
+    else:
+        # Convert tree into an lxml etree if it's not one
+        if not hasattr(svg, 'iter'):
+            svg = etree.parse(svg) if hasattr(svg, 'read') else etree.fromstring(svg)
+        events = etree.iterwalk(svg, events=('start', 'end'))
+        draw.root = svg.getroot() if hasattr(svg, 'getroot') else svg
+    draw._walk(events, identity, {}, stream=stream)
+    draw._flush()
+    return draw
+
+
+def _digest(svg, stream):
+    """
+    Return (the SHA-1 hash of an SVG's content, the SVG to draw). Files are
+    hashed in chunks, then reopened or rewound, so that streamed SVGs are not
+    held in memory. Files that cannot be rewound (e.g. pipes) are read whole.
+    """
+    if hasattr(svg, 'iter'):
+        return hashlib.sha1(etree.tostring(svg)).hexdigest(), svg
+    if not hasattr(svg, 'read') and not stream:
+        return hashlib.sha1(svg).hexdigest(), svg
+    handle = svg if hasattr(svg, 'read') else open(svg, 'rb')
+    try:
+        start = handle.tell()
+    except (AttributeError, IOError):
+        content = handle.read()
+        return hashlib.sha1(content).hexdigest(), BytesIO(content)
+    sha = hashlib.sha1()
+    try:
+        for chunk in iter(lambda: handle.read(1 << 20), b''):
+            sha.update(chunk)
+    finally:
+        if handle is svg:
+            handle.seek(start)
+        else:
+            handle.close()
+    return sha.hexdigest(), svg
+
+
+def _cached(cache, slide, svg, width, height, size, ids, stream, compact, merge, simplify,
+            profile, groups, cull, fit):
+    """svg2mso() with a cache. See svg2mso"""
+    digest, svg = _digest(svg, stream)
+    size = size or slide_size(slide)
+    key = cache.key(digest, width, height, size, stream, compact, merge, simplify, groups, cull,
+                    fit)
+
+    draw, xml = None, cache.get(key)
+    if xml is None:
+        # Draw into a list, and save each shape as it would be written.
+        # (Appending shapes to a tree would move their namespace declarations)
+        shapes = []
+        draw = svg2mso(shapes, svg, width, height, size, IdAllocator(1), stream, compact,
+                       merge, simplify, profile, groups, cull=cull, fit=fit)
+        cache[key] = b''.join([b'<shapes>'] + [etree.tostring(shp) for shp in shapes] +
+                              [b'</shapes>'])
+    else:
+        shapes = etree.fromstring(xml)
 
-        tag = match.groups()[-1]
-        if tag in valid_tags:
-            getattr(draw, tag)(e)
+    tree = shape_tree(slide)
+    if ids is None:
+        ids = IdAllocator.of(tree)
+    for shp in list(shapes):
+        tree.append(renumber(shp, ids))
+    return draw
 
 
 if __name__ == '__main__':
@@ -404,14 +1420,21 @@ if __name__ == '__main__':
     parser.add_argument('--output',
         default='output.pptx',
         help='Output PPTX file name')
+    parser.add_argument('--stream', action='store_true',
+        help='Parse the SVG incrementally, for very large files')
+    parser.add_argument('--merge', type=int, default=0,
+        help='Merge up to N adjacent shapes with the same style into one')
+    parser.add_argument('--simplify', type=float, default=0,
+        help='Drop path points within this many pixels of the path')
     parser.add_argument('svgfile')
     args = parser.parse_args()
 
-    from pptx import Presentation
+    from pypptx import PackageWriter
 
-    ppt = Presentation(args.layout)
-    blank_slidelayout = ppt.slidelayouts[6]
-    slide = ppt.slides.add_slide(blank_slidelayout)
-    tree = html.parse(open(args.svgfile))
-    svg2mso(slide, tree)
-    ppt.save(args.output)
+    options = {'merge': args.merge, 'simplify': args.simplify * emu_per_pixel}
+    with PackageWriter(args.output, args.layout) as deck:
+        with deck.slide() as slide:
+            if args.stream:
+                svg2mso(slide, args.svgfile, size=deck.size, stream=True, **options)
+            else:
+                svg2mso(slide, etree.parse(args.svgfile), size=deck.size, **options)
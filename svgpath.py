@@ -0,0 +1,268 @@
+"""
+Parses SVG path data into absolute move, line, Bezier and close commands.
+
+    commands, coords = parse('M10,10 h20 v20 a10,10 0 0,1 -20,0 z')
+
+commands is a string with one letter per command:
+
+- M: move to 1 point
+- L: line to 1 point
+- C: cubic Bezier to 1 point, via 2 control points
+- Q: quadratic Bezier to 1 point, via 1 control point
+- Z: close the sub-path. No points
+
+coords is an array('d') with the x, y of each point, in order. H and V become
+L, S and T become C and Q, and arcs are converted into cubic Beziers.
+"""
+import re
+import math
+from array import array
+
+re_number = r'[\+\-]?(?:\d+\.?\d*|\.\d+)(?:[eE][\+\-]?\d+)?'
+re_token = re.compile(r'[MmZzLlHhVvCcSsQqTtAa]|' + re_number)
+re_flag = re.compile(r'[\s,]*([01])')
+re_arc_token = re.compile(r'[\s,]*([MmZzLlHhVvCcSsQqTtAa]|' + re_number + ')')
+
+# Number of parameters each command takes
+nargs = {'m': 2, 'l': 2, 'h': 1, 'v': 1, 'c': 6, 's': 4, 'q': 4, 't': 2, 'a': 7, 'z': 0}
+
+
+def tokenize(d):
+    """Return the command letters and numbers in path data d as strings"""
+    if 'a' not in d and 'A' not in d:
+        return re_token.findall(d)
+    # Arc flags may be written without separators, e.g. "a5 5 0 1110 10".
+    # Read flags one character at a time
+    tokens, pos, cmd, n = [], 0, None, 0
+    while True:
+        if cmd == 'a' and n % 7 in (3, 4):
+            match = re_flag.match(d, pos)
+        else:
+            match = re_arc_token.match(d, pos)
+        if not match:
+            return tokens
+        token, pos = match.group(1), match.end()
+        tokens.append(token)
+        if token.isalpha():
+            cmd, n = token.lower(), 0
+        else:
+            n += 1
+
+
+def parse(d):
+    """Return (commands, coords) for the SVG path data d"""
+    tokens = tokenize(d)
+    commands, coords = [], array('d')
+    add, extend = commands.append, coords.extend
+    x = y = x0 = y0 = 0.0       # current point, start of sub-path
+    cx = cy = 0.0               # last control point, for S and T
+    cmd, last, i, n = None, None, 0, len(tokens)
+    while i < n:
+        token = tokens[i]
+        if token.isalpha():
+            cmd = token
+            i += 1
+            if cmd in 'Zz':
+                add('Z')
+                x, y, last = x0, y0, 'z'
+                continue
+        elif cmd is None or cmd in 'Zz':
+            break
+        op = cmd.lower()
+        k = nargs[op]
+        try:
+            v = [float(t) for t in tokens[i:i + k]]
+        except ValueError:
+            break
+        if len(v) < k:
+            break
+        i += k
+        dx, dy = (x, y) if cmd == op else (0.0, 0.0)
+
+        if op == 'm':
+            x = x0 = v[0] + dx
+            y = y0 = v[1] + dy
+            add('M')
+            extend((x, y))
+            # Subsequent coordinate pairs are implicit line-to commands
+            cmd = 'l' if cmd == 'm' else 'L'
+        elif op == 'l':
+            x, y = v[0] + dx, v[1] + dy
+            add('L')
+            extend((x, y))
+        elif op == 'h':
+            x = v[0] + dx
+            add('L')
+            extend((x, y))
+        elif op == 'v':
+            y = v[0] + dy
+            add('L')
+            extend((x, y))
+        elif op == 'c':
+            cx, cy = v[2] + dx, v[3] + dy
+            add('C')
+            extend((v[0] + dx, v[1] + dy, cx, cy))
+            x, y = v[4] + dx, v[5] + dy
+            extend((x, y))
+        elif op == 's':
+            x1, y1 = (2 * x - cx, 2 * y - cy) if last in ('c', 's') else (x, y)
+            cx, cy = v[0] + dx, v[1] + dy
+            add('C')
+            extend((x1, y1, cx, cy))
+            x, y = v[2] + dx, v[3] + dy
+            extend((x, y))
+        elif op == 'q':
+            cx, cy = v[0] + dx, v[1] + dy
+            x, y = v[2] + dx, v[3] + dy
+            add('Q')
+            extend((cx, cy, x, y))
+        elif op == 't':
+            cx, cy = (2 * x - cx, 2 * y - cy) if last in ('q', 't') else (x, y)
+            x, y = v[0] + dx, v[1] + dy
+            add('Q')
+            extend((cx, cy, x, y))
+        elif op == 'a':
+            x2, y2 = v[5] + dx, v[6] + dy
+            curves = arc(x, y, v[0], v[1], v[2], v[3], v[4], x2, y2)
+            for j in range(0, len(curves), 6):
+                add('C')
+            extend(curves)
+            x, y = x2, y2
+        last = op
+    return ''.join(commands), coords
+
+
+def arc(x1, y1, rx, ry, angle, large_arc, sweep, x2, y2):
+    """
+    Return the control points of cubic Beziers approximating an SVG elliptical
+    arc from (x1, y1) to (x2, y2), as a flat list: 6 numbers per Bezier.
+
+    Refer <http://www.w3.org/TR/SVG/implnote.html#ArcImplementationNotes>
+    """
+    if x1 == x2 and y1 == y2:
+        return []
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0:
+        return [x1, y1, x2, y2, x2, y2]
+    phi = math.radians(angle % 360)
+    cos, sin = math.cos(phi), math.sin(phi)
+
+    # Step 1: compute (x1', y1')
+    hx, hy = (x1 - x2) / 2.0, (y1 - y2) / 2.0
+    xp, yp = cos * hx + sin * hy, -sin * hx + cos * hy
+
+    # Ensure radii are large enough
+    scale = (xp * xp) / (rx * rx) + (yp * yp) / (ry * ry)
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+
+    # Step 2: compute (cx', cy')
+    num = rx * rx * ry * ry - rx * rx * yp * yp - ry * ry * xp * xp
+    den = rx * rx * yp * yp + ry * ry * xp * xp
+    coef = math.sqrt(max(0.0, num / den))
+    if large_arc == sweep:
+        coef = -coef
+    cxp, cyp = coef * rx * yp / ry, -coef * ry * xp / rx
+
+    # Step 3: compute (cx, cy)
+    cx = cos * cxp - sin * cyp + (x1 + x2) / 2.0
+    cy = sin * cxp + cos * cyp + (y1 + y2) / 2.0
+
+    # Step 4: compute the start angle and sweep
+    theta = math.atan2((yp - cyp) / ry, (xp - cxp) / rx)
+    delta = math.atan2((-yp - cyp) / ry, (-xp - cxp) / rx) - theta
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+
+    # Split into segments of at most 90 degrees, each a cubic Bezier
+    segments = int(math.ceil(abs(delta) / (math.pi / 2) - 1e-9)) or 1
+    step = delta / segments
+    k = 4.0 / 3 * math.tan(step / 4)
+    points = []
+    for i in range(segments):
+        t1, t2 = theta + i * step, theta + (i + 1) * step
+        c1, s1, c2, s2 = math.cos(t1), math.sin(t1), math.cos(t2), math.sin(t2)
+        # Control points on the unit circle, scaled, rotated and translated
+        for ux, uy in ((c1 - k * s1, s1 + k * c1), (c2 + k * s2, s2 - k * c2), (c2, s2)):
+            ux, uy = rx * ux, ry * uy
+            points.append(cos * ux - sin * uy + cx)
+            points.append(sin * ux + cos * uy + cy)
+    # Land exactly on the end point
+    points[-2:] = [x2, y2]
+    return points
+
+
+
+# Number of co-ordinates each parsed command takes
+ncoords = {'M': 2, 'L': 2, 'C': 6, 'Q': 4, 'Z': 0}
+
+
+def simplify(commands, coords, tolerance):
+    """
+    Return (commands, coords) with each run of L (line to) commands reduced
+    by the Douglas-Peucker algorithm, dropping points that are within
+    tolerance of the lines through the points that remain. Other commands
+    are kept as is. For example:
+
+        simplify('MLLL', [0, 0, 10, 1, 20, 0, 30, 0], tolerance=2)
+        # ('ML', [0, 0, 30, 0])
+    """
+    result, points = [], []
+
+    def lines(run):
+        keep = _douglas_peucker(run, tolerance) if len(run) > 2 else range(len(run))
+        for j in keep[1:]:
+            result.append('L')
+            points.extend(run[j])
+
+    # run has the current point, followed by the points of each line to
+    start = current = (0, 0)
+    run, i = [current], 0
+    for cmd in commands:
+        if cmd == 'L':
+            run.append((coords[i], coords[i + 1]))
+            i += 2
+            continue
+        lines(run)
+        n = ncoords[cmd]
+        result.append(cmd)
+        points.extend(coords[i:i + n])
+        i += n
+        if cmd == 'Z':
+            current = start
+        else:
+            current = (coords[i - 2], coords[i - 1])
+            if cmd == 'M':
+                start = current
+        run = [current]
+    lines(run)
+    return ''.join(result), points
+
+
+def _douglas_peucker(points, tolerance):
+    """Return the indices of the (x, y) points to keep, in order"""
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    limit = tolerance * tolerance
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = points[first]
+        dx, dy = points[last][0] - x1, points[last][1] - y1
+        length = float(dx * dx + dy * dy)
+        # Find the point farthest from the segment between first and last
+        farthest, index = -1, None
+        for j in xrange(first + 1, last):
+            px, py = points[j][0] - x1, points[j][1] - y1
+            t = min(max((px * dx + py * dy) / length, 0.0), 1.0) if length else 0.0
+            ex, ey = px - t * dx, py - t * dy
+            distance = ex * ex + ey * ey
+            if distance > farthest:
+                farthest, index = distance, j
+        if farthest > limit:
+            keep[index] = True
+            stack.append((index, last))
+            stack.append((first, index))
+    return [j for j, k in enumerate(keep) if k]
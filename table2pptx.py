@@ -0,0 +1,168 @@
+"""
+Converts HTML tables into PowerPoint tables, continued across slides.
+
+Source: https://github.com/gramener/pypptx
+
+Usage: python table2pptx.py --output output.pptx input.html
+"""
+import math
+from xml.sax.saxutils import escape
+from lxml import etree
+from pypptx import a, nsmap, cust_table, table_rows, slide_size, shape_tree, IdAllocator
+
+# Space around the table on the slide, and inside each cell, in EMU
+slide_margin = 457200
+cell_margin_x, cell_margin_y = 91440, 45720
+# Average character width and line height, as a fraction of the font size
+char_width, line_height = 0.5, 1.2
+
+
+def cell_text(cell):
+    """Return the text in a table cell, ignoring embedded SVG and styles"""
+    text = cell.xpath('descendant-or-self::text()[not(ancestor::svg or ancestor::style)]')
+    return ' '.join(' '.join(text).split())
+
+
+class Pages(object):
+    """
+    Lays out the rows of one table across slides. add() each row, then
+    close(). When the rows fill a slide, they are drawn as a table on the
+    slide returned by new_slide(), and the header rows are repeated on the
+    next slide. Only one slide's rows are held in memory at a time.
+    """
+    def __init__(self, new_slide, size=None, font_size=1200, box=None):
+        self.new_slide, self.size, self.font_size = new_slide, size, font_size
+        self.box = box
+        self.header, self.rows, self.used = [], [], 0
+        self.columns = None
+        self.pages = 0
+
+    def _layout(self, slide):
+        """Set the table's position and column widths from the first slide"""
+        width, height = self.size or slide_size(slide)
+        self.x, self.y, self.width, self.height = self.box or (
+            slide_margin, slide_margin, width - 2 * slide_margin, height - 2 * slide_margin)
+        self.grid = [self.width / self.columns] * self.columns
+        self.grid[-1] += self.width - sum(self.grid)
+
+    def _row(self, cells):
+        """Return (height, cells) for a row of (colspan, text) cells"""
+        pt = self.font_size / 100.0
+        lines, row, column = 1, [], 0
+        for span, text in cells:
+            # The grid is set by the first row. Clip cells that overflow it
+            if column >= self.columns:
+                break
+            span = max(1, min(span, self.columns - column))
+            width = sum(self.grid[column:column + span]) - 2 * cell_margin_x
+            chars = max(1, int(width / (pt * char_width * 12700)))
+            lines = max(lines, int(math.ceil(len(text) / float(chars))) or 1)
+            attrs = ' gridSpan="%d"' % span if span > 1 else ''
+            row.append((attrs, self.font_size, escape(text)))
+            # Cells covered by a colspan are merged into it
+            row.extend((' hMerge="1"', self.font_size, '') for i in range(span - 1))
+            column += span
+        # Pad short rows, so that every row has a cell for each column
+        row.extend(('', self.font_size, '') for i in range(self.columns - column))
+        return int(lines * pt * line_height * 12700) + 2 * cell_margin_y, row
+
+    def add(self, cells, header=False):
+        """Add a row of (colspan, text) cells. Header rows repeat on each slide"""
+        if self.columns is None:
+            self.columns = sum(span for span, text in cells) or 1
+            self.slide = self.new_slide()
+            self._layout(self.slide)
+        row = self._row(cells)
+        if header and not self.pages:
+            self.header.append(row)
+        if self.rows and self.used + row[0] > self.height:
+            self._draw()
+            self.slide = self.new_slide()
+            self.rows = list(self.header)
+            self.used = sum(height for height, cells in self.header)
+        if not header or not self.pages:
+            self.rows.append(row)
+            self.used += row[0]
+
+    def _draw(self):
+        shapes = shape_tree(self.slide)
+        ids = IdAllocator.of(shapes)
+        frame = cust_table(self.x, self.y, self.width, self.used, ids=ids)
+        tbl = frame.find('.//a:tbl', namespaces=nsmap)
+        tbl.append(a.tblGrid(*[a.gridCol(w=str(w)) for w in self.grid]))
+        for tr in table_rows(self.rows):
+            tbl.append(tr)
+        shapes.append(frame)
+        self.rows, self.used = [], 0
+        self.pages += 1
+
+    def close(self):
+        """Draw the remaining rows. Returns the number of slides used"""
+        if self.rows:
+            self._draw()
+        return self.pages
+
+
+def table2mso(html, new_slide, size=None, font_size=1200, box=None):
+    """
+    Draw each table in an HTML file as a PowerPoint table, continued over as
+    many slides as needed. html is a file name or file. The HTML is parsed
+    incrementally, and each row is freed once laid out, so tables with many
+    thousands of rows use little memory.
+
+    new_slide() must return a new python-pptx slide or p:spTree each time it
+    is called. size is the slide (width, height) in EMU, if it is not a
+    python-pptx slide. font_size is in 1/100 of a point. box is the table's
+    (x, y, width, height) in EMU on each slide, and defaults to the slide
+    less a margin.
+
+    Rows in <thead> or with only <th> cells are repeated on each slide.
+    colspan is supported. rowspan, cell styles and nested SVG are not.
+
+    Returns the number of slides used.
+    """
+    pages, slides = None, 0
+    for event, e in etree.iterparse(html, events=('start', 'end'), tag=('table', 'tr'),
+                                    html=True):
+        if e.tag == 'table':
+            if event == 'start':
+                pages = Pages(new_slide, size, font_size, box)
+            else:
+                slides += pages.close()
+        elif event == 'end' and pages is not None:
+            cells = [(int(cell.get('colspan', 1) or 1), cell_text(cell))
+                     for cell in e if cell.tag in ('td', 'th')]
+            if cells:
+                header = (e.getparent().tag == 'thead' or
+                          all(cell.tag == 'th' for cell in e if cell.tag in ('td', 'th')))
+                pages.add(cells, header)
+            # Free this row and the rows before it
+            e.clear()
+            while e.getprevious() is not None:
+                del e.getparent()[0]
+    return slides
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--layout',
+        default='layout15x12.pptx',
+        help='PPTX file to use to create blank slides')
+    parser.add_argument('--output',
+        default='output.pptx',
+        help='Output PPTX file name')
+    parser.add_argument('--font-size', type=float, default=12,
+        help='Font size in points (default: 12)')
+    parser.add_argument('htmlfile')
+    args = parser.parse_args()
+
+    from pptx import Presentation
+
+    ppt = Presentation(args.layout)
+    blank_slidelayout = ppt.slidelayouts[6]
+    slides = table2mso(args.htmlfile, lambda: ppt.slides.add_slide(blank_slidelayout),
+                       font_size=int(args.font_size * 100))
+    ppt.save(args.output)
+    print '%d slides' % slides